@@ -6,3 +6,6 @@ class ApiConfig(AppConfig):
     name = 'api'
     verbose_name = 'API для проекта Foodgram'
     verbose_name_plural = 'API для проекта Foodgram'
+
+    def ready(self):
+        import api.signals  # noqa: F401
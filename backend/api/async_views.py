@@ -0,0 +1,47 @@
+"""Асинхронные (ASGI) точки входа для чтения рецептов, тегов и ингредиентов.
+
+Запрос обрабатывает тот же вьюсет, что и под WSGI: кэш ответов, ETag,
+пагинация, троттлинг и формат ответа общие. Синхронные представления
+Django под ASGI выполняет по очереди в одном потоке, а эти — в пуле
+потоков: запросы к БД разных запросов идут параллельно, у каждого
+потока пула своё соединение. Независимые запросы одного запроса
+тоже идут параллельно (api.concurrency).
+"""
+from api.concurrency import concurrent, in_pool
+from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+
+def async_view(viewset, actions):
+    """Асинхронное представление, которое выполняет вьюсет в пуле потоков.
+
+    Внутри вьюсета независимые запросы (страница рецептов и множества
+    id пользователя) выполняются параллельно (api.concurrency).
+    """
+    view = viewset.as_view(actions)
+
+    def run(request, *args, **kwargs):
+        concurrent.set(True)
+        response = view(request, *args, **kwargs)
+        # Ответ DRF отрисовывается здесь, а не в потоке Django.
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    run = in_pool(run)
+
+    async def handle(request, *args, **kwargs):
+        return await run(request, *args, **kwargs)
+
+    # Токен-аутентификация DRF не использует сессии: CSRF не проверяется.
+    handle.csrf_exempt = True
+    return handle
+
+
+recipe_list = async_view(RecipeViewSet, {'get': 'list', 'post': 'create'})
+recipe_detail = async_view(RecipeViewSet, {
+    'get': 'retrieve', 'put': 'update',
+    'patch': 'partial_update', 'delete': 'destroy'})
+tag_list = async_view(TagViewSet, {'get': 'list'})
+tag_detail = async_view(TagViewSet, {'get': 'retrieve'})
+ingredient_list = async_view(IngredientViewSet, {'get': 'list'})
+ingredient_detail = async_view(IngredientViewSet, {'get': 'retrieve'})
@@ -0,0 +1,161 @@
+"""Кэширование ответов API с инвалидацией по группам (тегам) ключей.
+
+Каждая запись хранит версии своих групп на момент сохранения.
+Инвалидация группы меняет её версию, и все записи группы
+перестают считаться актуальными без перебора ключей.
+
+Кэш ответов работает только с общим для процессов кэшем
+(RESPONSE_CACHE): с кэшем в памяти процесса воркеры не видели бы
+инвалидаций друг друга. Без него записи не сохраняются.
+"""
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, Value
+
+from foodgram_backend.db_router import pin_to_primary
+from recipes.models import Tag
+
+TAG_PREFIX = 'cache-tag'
+RESPONSE_PREFIX = 'response'
+
+# Группы ключей.
+RECIPE_LIST_TAG = 'recipes'
+CATALOGUE_TAG = 'catalogue'
+
+
+def recipe_tag(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def author_tag(author_id):
+    return f'author:{author_id}'
+
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+
+def get_tag_versions(tags):
+    """Текущие версии групп для новой записи кэша.
+
+    Отсутствующие группы получают новую версию. Данные записи читаются
+    после этого из primary: отстающая реплика сразу после записи
+    сохранила бы в кэш прежние данные под новой версией группы.
+    """
+    pin_to_primary()
+    if not settings.RESPONSE_CACHE:
+        return {tag: uuid4().hex for tag in tags}
+    keys = {f'{TAG_PREFIX}:{tag}': tag for tag in tags}
+    versions = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in versions}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, timeout=None)
+        versions.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def invalidate(*tags):
+    """Сделать неактуальными все записи указанных групп.
+
+    Версии меняются после фиксации транзакции: запрос, прочитавший
+    до неё прежние данные, иначе сохранил бы их под новой версией.
+    """
+    if not settings.RESPONSE_CACHE:
+        return
+    transaction.on_commit(lambda: cache.set_many(
+        {f'{TAG_PREFIX}:{tag}': uuid4().hex for tag in tags}, timeout=None))
+
+
+def invalidate_recipe(recipe_id):
+    invalidate(recipe_tag(recipe_id), RECIPE_LIST_TAG)
+
+
+def make_key(*parts):
+    return md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def get_many_responses(keys):
+    """Актуальные записи из кэша: словарь ключ -> данные."""
+    if not settings.RESPONSE_CACHE:
+        return {}
+    entries = cache.get_many([f'{RESPONSE_PREFIX}:{key}' for key in keys])
+    tags = {tag for versions, data in entries.values() for tag in versions}
+    stored = cache.get_many([f'{TAG_PREFIX}:{tag}' for tag in tags])
+    return {
+        key[len(RESPONSE_PREFIX) + 1:]: data
+        for key, (versions, data) in entries.items()
+        if all(stored.get(f'{TAG_PREFIX}:{tag}') == version
+               for tag, version in versions.items())
+    }
+
+
+def set_many_responses(entries, timeout=None):
+    """Сохранить записи: словарь ключ -> (версии групп, данные).
+
+    Версии групп нужно получить до формирования данных, иначе
+    инвалидация во время формирования ответа будет потеряна.
+    """
+    if not settings.RESPONSE_CACHE:
+        return
+    cache.set_many(
+        {f'{RESPONSE_PREFIX}:{key}': entry for key, entry in entries.items()},
+        timeout=timeout or settings.RESPONSE_CACHE_TIMEOUT,
+    )
+
+
+def get_response(key):
+    """Данные ответа из кэша или None, если запись устарела."""
+    return get_many_responses([key]).get(key)
+
+
+def set_response(key, data, versions, timeout=None):
+    set_many_responses({key: (versions, data)}, timeout)
+
+
+def get_user_sets(user):
+    """Избранное, список покупок и подписки пользователя одним запросом."""
+    user_sets = {
+        'favorited_ids': set(), 'cart_ids': set(), 'subscribed_ids': set()}
+    if user.is_anonymous:
+        return user_sets
+    key = make_key('user-sets', user.id)
+    cached = get_response(key)
+    if cached is not None:
+        return cached
+    versions = get_tag_versions((user_tag(user.id),))
+    rows = (
+        user.favorites.annotate(
+            kind=Value('favorited_ids', output_field=CharField()))
+        .order_by()
+        .values_list('kind', 'recipe_id')
+        .union(
+            user.shoppingcarts.annotate(
+                kind=Value('cart_ids', output_field=CharField()))
+            .order_by()
+            .values_list('kind', 'recipe_id'),
+            user.follower.annotate(
+                kind=Value('subscribed_ids', output_field=CharField()))
+            .order_by()
+            .values_list('kind', 'author_id'),
+            all=True)
+    )
+    for kind, object_id in rows:
+        user_sets[kind].add(object_id)
+    set_response(key, user_sets, versions)
+    return user_sets
+
+
+def get_tag_ids():
+    """Словарь слаг -> id всех тегов."""
+    key = make_key('tag-ids')
+    tag_ids = get_response(key)
+    if tag_ids is None:
+        versions = get_tag_versions((CATALOGUE_TAG,))
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        set_response(key, tag_ids, versions)
+    return tag_ids
@@ -0,0 +1,82 @@
+"""Снимок каталога ингредиентов для автодополнения на клиенте.
+
+Снимок — компактный JSON по столбцам: словарь единиц измерения
+без повторов, отсортированные названия, номера единиц и id:
+
+    {"version": "...", "units": ["г", "кг"],
+     "names": ["абрикос", ...], "unit": [0, ...], "id": [17, ...]}
+
+Версия — хэш содержимого, поэтому снимок отдаётся по неизменному
+URL с бессрочным кэшированием. Готовые сжатые варианты хранятся
+в кэше до изменения каталога (группа CATALOGUE_TAG).
+"""
+import gzip
+import json
+from hashlib import sha256
+
+from api import cache
+from foodgram_backend.constants import CATALOGUE_SNAPSHOT_TIMEOUT
+from recipes.models import Ingredient
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SNAPSHOT_KEY = 'ingredients-snapshot'
+VERSION_LENGTH = 16
+
+
+def build_snapshot():
+    """Снимок и его сжатые варианты: словарь кодировка -> байты."""
+    rows = sorted(
+        Ingredient.objects.values_list('name', 'measurement_unit', 'id'))
+    units = sorted({unit for _, unit, _ in rows})
+    unit_index = {unit: index for index, unit in enumerate(units)}
+    content = {
+        'units': units,
+        'names': [name for name, _, _ in rows],
+        'unit': [unit_index[unit] for _, unit, _ in rows],
+        'id': [ingredient_id for _, _, ingredient_id in rows],
+    }
+    version = sha256(json.dumps(
+        content, ensure_ascii=False).encode()).hexdigest()[:VERSION_LENGTH]
+    body = json.dumps(
+        {'version': version, **content}, ensure_ascii=False,
+        separators=(',', ':')).encode()
+    encodings = {
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+    }
+    if brotli is not None:
+        encodings['br'] = brotli.compress(body)
+    return {'version': version, 'count': len(rows), 'encodings': encodings}
+
+
+def get_snapshot():
+    """Снимок каталога; пересобирается только после изменения каталога."""
+    snapshot = cache.get_response(SNAPSHOT_KEY)
+    if snapshot is None:
+        versions = cache.get_tag_versions((cache.CATALOGUE_TAG,))
+        snapshot = build_snapshot()
+        cache.set_response(
+            SNAPSHOT_KEY, snapshot, versions, CATALOGUE_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def choose_encoding(accept_encoding, encodings):
+    """Лучшая из доступных кодировок по заголовку Accept-Encoding."""
+    accepted = set()
+    for part in accept_encoding.split(','):
+        name, _, params = part.partition(';')
+        quality = params.strip().partition('q=')[2]
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip().lower())
+    for encoding in ('br', 'gzip'):
+        if encoding in encodings and encoding in accepted:
+            return encoding
+    return 'identity'
@@ -0,0 +1,53 @@
+"""Параллельные независимые запросы к БД внутри одного запроса.
+
+Асинхронные представления (api.async_views) включают параллельный
+режим: тогда run_concurrently выполняет функции одновременно, первую —
+в текущем потоке, остальные — в отдельном пуле потоков, у каждого
+потока своё соединение с БД. Пул не общий с пулом представлений:
+поток представления ждёт пул запросов, и взаимной блокировки нет.
+Под WSGI функции выполняются по очереди: лишние потоки синхронному
+воркеру не нужны.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from foodgram_backend.profiling import sample_thread
+
+concurrent = ContextVar('concurrent', default=False)
+lookup_pool = ThreadPoolExecutor(
+    max_workers=settings.CONCURRENT_LOOKUP_THREADS,
+    thread_name_prefix='lookup')
+
+
+def in_thread(func):
+    """func для выполнения в чужом потоке.
+
+    Поток сэмплируется, если запрос профилируется, а соединения
+    с БД, отжившие своё, закрываются после выполнения.
+    """
+    def run(*args, **kwargs):
+        try:
+            with sample_thread():
+                return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return run
+
+
+def in_pool(func):
+    """Корутинная функция, которая выполняет func в потоке пула asgiref."""
+    return sync_to_async(in_thread(func), thread_sensitive=False)
+
+
+def run_concurrently(first, *funcs):
+    """Результаты вызовов first и funcs в том же порядке."""
+    if not concurrent.get():
+        return [first(), *(func() for func in funcs)]
+    futures = [lookup_pool.submit(copy_context().run, in_thread(func))
+               for func in funcs]
+    return [first(), *(future.result() for future in futures)]
@@ -1,7 +1,13 @@
+from django import forms
+from django.db.models import Count, Exists, OuterRef
 from django_filters.rest_framework import CharFilter, FilterSet, filters
 
+from api.cache import get_tag_ids
 from recipes.models import Ingredient, Recipe
 
+TAGS_MODE_ANY = 'any'
+TAGS_MODE_ALL = 'all'
+
 
 class IngredientFilter(FilterSet):
     """Класс для фильтрации обьектов Ingredients."""
@@ -13,10 +19,49 @@ class IngredientFilter(FilterSet):
         fields = ('name',)
 
 
+class MultipleSlugField(forms.MultipleChoiceField):
+    """Список слагов без проверки по списку вариантов."""
+
+    def valid_value(self, value):
+        return True
+
+
+class TagsFilter(filters.Filter):
+    """Фильтр по слагам тегов одним подзапросом EXISTS.
+
+    Слаги переводятся в id по кэшированному словарю тегов, поэтому
+    нет ни JOIN через M2M (и дубликатов рецептов), ни запроса вариантов.
+    """
+
+    field_class = MultipleSlugField
+
+    def filter(self, queryset, value):
+        if not value:
+            return queryset
+        tag_map = get_tag_ids()
+        tag_ids = {tag_map[slug] for slug in value if slug in tag_map}
+        if not tag_ids:
+            return queryset.none()
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'), tag_id__in=tag_ids)
+        if self.parent.data.get('tags_mode') == TAGS_MODE_ALL:
+            if len(tag_ids) < len(set(value)):
+                return queryset.none()
+            recipe_tags = (
+                recipe_tags.values('recipe_id')
+                .annotate(tags_count=Count('tag_id'))
+                .filter(tags_count=len(tag_ids)))
+        return queryset.filter(Exists(recipe_tags))
+
+
 class RecipeFilter(FilterSet):
     """Класс для фильтрации обьектов Recipe."""
 
-    tags = filters.AllValuesMultipleFilter(field_name="tags__slug")
+    tags = TagsFilter()
+    tags_mode = filters.ChoiceFilter(
+        choices=((TAGS_MODE_ANY, 'любой из тегов'),
+                 (TAGS_MODE_ALL, 'все теги')),
+        method='filter_tags_mode')
 
     is_favorited = filters.NumberFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.NumberFilter(
@@ -26,6 +71,10 @@ class RecipeFilter(FilterSet):
         model = Recipe
         fields = ('author', 'tags', 'is_in_shopping_cart', 'is_favorited')
 
+    def filter_tags_mode(self, queryset, name, value):
+        """Режим применяется в фильтре tags."""
+        return queryset
+
     def get_is_favorited(self, queryset, name, value):
         """Возвращает Избранное."""
         if self.request.user.is_authenticated and value:
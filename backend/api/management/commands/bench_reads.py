@@ -0,0 +1,49 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?limit=12&tags=breakfast',
+    '/api/tags/',
+    '/api/ingredients/?name=%D1%81%D0%BE',
+)
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест эндпоинтов чтения: '
+            'пропускная способность при параллельных запросах')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'base_url', type=str, help='например, http://127.0.0.1:8000')
+        parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--token', type=str, default='')
+
+    def fetch(self, url, token):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        start = time.perf_counter()
+        with urlopen(Request(url, headers=headers)) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+        paths = options['paths']
+        urls = [base_url + paths[number % len(paths)]
+                for number in range(options['requests'])]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            latencies = sorted(executor.map(
+                lambda url: self.fetch(url, options['token']), urls))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'***** {len(urls)} запросов за {elapsed:.2f} с: '
+            f'{len(urls) / elapsed:.1f} RPS, '
+            f'медиана {statistics.median(latencies) * 1000:.1f} мс, '
+            f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} мс'))
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.renderers import FastJSONRenderer
+from api.serializers import RecipeReadSerializer
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Сравнение затрат CPU: RecipeReadSerializer + JSONRenderer '
+            'против values_data + FastJSONRenderer')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=6,
+                            help='рецептов на странице')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def measure(self, func, repeat):
+        start = time.process_time()
+        for _ in range(repeat):
+            result = func()
+        return (time.process_time() - start) / repeat * 1000, result
+
+    def handle(self, *args, **options):
+        request = Request(RequestFactory().get('/api/recipes/'))
+        ids = list(Recipe.objects.values_list(
+            'id', flat=True)[:options['recipes']])
+        queryset = Recipe.objects.filter(id__in=ids)
+
+        def serializer_data():
+            return RecipeReadSerializer(
+                queryset.select_related('author').prefetch_related(
+                    'ingredients', 'tags'),
+                many=True, context={'request': request}).data
+
+        def values_data():
+            return RecipeReadSerializer.values_data(queryset, request)
+
+        full, data = self.measure(serializer_data, options['repeat'])
+        compact, compact_data = self.measure(values_data, options['repeat'])
+        render, content = self.measure(
+            lambda: JSONRenderer().render(data), options['repeat'])
+        fast_render, fast_content = self.measure(
+            lambda: FastJSONRenderer().render(compact_data),
+            options['repeat'])
+        if content != fast_content:
+            self.stdout.write(self.style.ERROR('***** Ответы различаются'))
+        self.stdout.write(self.style.SUCCESS(
+            f'***** {len(ids)} рецептов, CPU на страницу:\n'
+            f'сериализатор {full:.2f} мс -> values_data {compact:.2f} мс\n'
+            f'JSONRenderer {render:.3f} мс -> '
+            f'FastJSONRenderer {fast_render:.3f} мс'))
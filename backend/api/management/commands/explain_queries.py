@@ -0,0 +1,68 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Subquery
+
+from api.serializers import ShortRecipeSerializer
+from api.shopping_cart import get_cart_ingredients
+from changes.log import last_change
+from recipes.models import Recipe, Tag
+from users.models import User
+
+# Таблицы, которые растут вместе с данными: полный просмотр недопустим.
+LARGE_TABLES = (
+    'recipes_recipe',
+    'recipes_recipe_tags',
+    'recipes_recipeingredient',
+    'recipes_reciperollup',
+    'recipes_favorite',
+    'recipes_shoppingcart',
+    'users_subscription',
+)
+SEQ_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(\w+)(?! USING)'),
+}
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN горячих запросов API; ошибка, если большие таблицы '
+            'читаются полным просмотром (запускать на seed_data)')
+
+    def hot_queries(self, user, tag):
+        recipes = Recipe.objects.all()
+        return {
+            'рецепты автора': recipes.filter(author=user)[:6],
+            'избранное': recipes.filter(favorites__user=user)[:6],
+            'список покупок': recipes.filter(shoppingcarts__user=user)[:6],
+            'рецепты по тегу': recipes.filter(tags__slug=tag.slug)[:6],
+            'скачать список покупок': get_cart_ingredients(user),
+            'подписки': User.objects.filter(following__user=user)[:6],
+            'последние рецепты авторов': ShortRecipeSerializer.previews_query(
+                User.objects.filter(following__user=user).values_list(
+                    'id', flat=True)[:6], 3),
+            'ETag списка рецептов': recipes.order_by('-updated_at').annotate(
+                last_change=Subquery(last_change()))[:1],
+        }
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(favorites__isnull=False).first()
+        tag = Tag.objects.first()
+        if user is None or tag is None:
+            raise CommandError('Нет данных: выполните seed_data.')
+        pattern = SEQ_SCAN.get(connection.vendor)
+        failed = []
+        for name, queryset in self.hot_queries(user, tag).items():
+            plan = queryset.explain()
+            scans = set(pattern.findall(plan)) if pattern else set()
+            bad = scans.intersection(LARGE_TABLES)
+            style = self.style.ERROR if bad else self.style.SUCCESS
+            self.stdout.write(style(f'***** {name}: '
+                                    f'{", ".join(bad) or "без Seq Scan"}'))
+            self.stdout.write(plan)
+            if bad:
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                f'Полный просмотр таблиц в запросах: {", ".join(failed)}')
@@ -0,0 +1,71 @@
+import glob
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram_backend.profiling import STACKS_SUFFIX, read_stacks
+
+
+class Command(BaseCommand):
+    help = ('Объединить стеки выборочного профилирования: общий файл '
+            'для flame graph и функции с наибольшим числом сэмплов')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*',
+            help='Файлы стеков (по умолчанию все из PROFILING_DIR)')
+        parser.add_argument(
+            '--view', default='',
+            help='Только запросы, в корне стека которых есть эта строка, '
+                 'например "GET api:recipes-list"')
+        parser.add_argument(
+            '--output', help='Записать объединённые стеки в файл')
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Сколько функций показать')
+        parser.add_argument(
+            '--delete', action='store_true',
+            help='Удалить прочитанные файлы')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or sorted(glob.glob(os.path.join(
+            settings.PROFILING_DIR, f'*{STACKS_SUFFIX}')))
+        if not paths:
+            raise CommandError('Нет файлов стеков.')
+        stacks = read_stacks(paths)
+        if options['view']:
+            stacks = Counter({
+                stack: count for stack, count in stacks.items()
+                if options['view'] in stack.partition(';')[0]})
+        total = sum(stacks.values())
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.writelines(
+                    f'{stack} {count}\n' for stack, count in stacks.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'***** Файлов: {len(paths)}, сэмплов: {total}'))
+        if total:
+            self.report(stacks, total, options['top'])
+        if options['delete']:
+            for path in paths:
+                os.remove(path)
+
+    def report(self, stacks, total, top):
+        views, inclusive, own = Counter(), Counter(), Counter()
+        for stack, count in stacks.items():
+            root, *frames = stack.split(';')
+            views[root] += count
+            # Рекурсивная функция учитывается в стеке один раз.
+            for frame in set(frames):
+                inclusive[frame] += count
+            if frames:
+                own[frames[-1]] += count
+        for title, counter in (('Запросы', views),
+                               ('Собственное время', own),
+                               ('Время с вызовами', inclusive)):
+            self.stdout.write(self.style.SUCCESS(f'***** {title}'))
+            for label, count in counter.most_common(top):
+                self.stdout.write(
+                    f'{100 * count / total:6.2f}% {count:8} {label}')
@@ -1,7 +1,118 @@
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import (
+    EmptyPage,
+    InvalidPage,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 
+from api import cache
+from foodgram_backend.constants import ESTIMATED_COUNT_THRESHOLD, MAX_PAGE_SIZE
+from foodgram_backend.counting import approximate_count
+
+
+class CheapCountPaginator(Paginator):
+    """Пагинатор с дешёвым подсчётом количества объектов.
+
+    Количество берётся из кэша (если переданы группы инвалидации),
+    для больших выборок — из оценки Postgres, иначе считается точно.
+    При skip_count количество не считается вовсе: наличие следующей
+    страницы определяется по одному лишнему объекту.
+    """
+
+    def __init__(self, object_list, per_page, cache_tags=None,
+                 skip_count=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cache_tags = cache_tags
+        self.skip_count = skip_count
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        if query.is_empty():
+            return 0
+        try:
+            sql, params = query.sql_with_params()
+        except EmptyResultSet:
+            # Условие заведомо ложно, например pk__in=[].
+            return 0
+        if not self.cache_tags:
+            return self.compute_count()
+        key = cache.make_key('count', sql, params)
+        count = cache.get_response(key)
+        if count is None:
+            versions = cache.get_tag_versions(self.cache_tags)
+            count = self.compute_count()
+            cache.set_response(
+                key, count, versions, settings.COUNT_CACHE_TIMEOUT)
+        return count
+
+    def compute_count(self):
+        """Оценка Postgres для больших выборок, иначе точное количество."""
+        estimate = approximate_count(self.object_list)
+        if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+        return self.object_list.count()
+
+    def page(self, number):
+        if not self.skip_count:
+            return super().page(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы не является целым числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage('Страница не содержит результатов')
+        # Нижняя граница количества: её достаточно для has_next().
+        self.count = bottom + len(objects)
+        return self._get_page(objects[:self.per_page], number, self)
+
 
 class LimitPageNumberPagination(PageNumberPagination):
-    """Класс пагинации страниц."""
+    """Класс пагинации страниц.
+
+    Параметр count=false отключает подсчёт: в ответе count равен null.
+    Вьюсет может задать группы инвалидации кэша количества методом
+    get_count_cache_tags().
+    """
     page_size = 6
     page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.skip_count = (
+            request.query_params.get(self.count_query_param) == 'false')
+        get_cache_tags = getattr(view, 'get_count_cache_tags', None)
+        paginator = CheapCountPaginator(
+            queryset, page_size,
+            cache_tags=get_cache_tags and get_cache_tags(),
+            skip_count=self.skip_count,
+        )
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)))
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.skip_count:
+            response.data['count'] = None
+        return response
@@ -6,4 +6,4 @@ class IsAuthor(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         return (request.method in SAFE_METHODS
-                or obj.author == request.user)
+                or obj.author_id == request.user.id)
@@ -1,13 +1,31 @@
+from collections import defaultdict
+from collections.abc import Mapping
+from operator import itemgetter
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from django.db.models import F
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
-
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from api.cache import get_user_sets, invalidate_recipe
+from changes.log import (
+    batch,
+    recipe_ingredient_entry,
+    recipe_tag_entry,
+    record,
+)
 from foodgram_backend.constants import (
     MAX_AMOUNT,
     MAX_COOKING_TIME,
+    MAX_MULTIPLIER,
+    MAX_RECIPES_PREVIEW,
     MIN_AMOUNT,
     MIN_COOKING_TIME,
+    MIN_MULTIPLIER,
 )
+from jobs.models import Job
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -16,6 +34,9 @@ from recipes.models import (
     ShoppingCart,
     Tag,
 )
+from recipes.rollups import save_rollups
+from recipes.signals import refresh_handled, replace_image
+from recipes.tasks import schedule_update_similar
 from users.models import Subscription, User
 
 
@@ -37,6 +58,12 @@ class FoodgramUserSerializer(serializers.ModelSerializer):
         read_only_fields = ('is_subscribed',)
 
     def get_is_subscribed(self, obj):
+        annotated = getattr(obj, 'is_subscribed', None)
+        if annotated is not None:
+            return annotated
+        subscribed_ids = self.context.get('subscribed_ids')
+        if subscribed_ids is not None:
+            return obj.id in subscribed_ids
         request = self.context.get('request')
         return (request and not request.user.is_anonymous
                 and request.user.follower.filter(author=obj.id).exists())
@@ -58,16 +85,87 @@ class IngredientSerializer(serializers.ModelSerializer):
         model = Ingredient
 
 
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField, который берёт объекты из загруженных заранее.
+
+    Список таких полей (many=True) и список сериализаторов с таким полем
+    загружают объекты всех элементов одним запросом через prefetch,
+    а не запросом на элемент. Ошибки те же, что у PrimaryKeyRelatedField.
+    """
+
+    prefetched = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        list_kwargs.update(
+            (key, value) for key, value in kwargs.items()
+            if key in MANY_RELATION_KWARGS)
+        return PrefetchedManyRelatedField(**list_kwargs)
+
+    def to_pk(self, data):
+        return self.get_queryset().model._meta.pk.to_python(data)
+
+    def prefetch(self, values):
+        """Загрузить объекты по списку входных значений одним запросом."""
+        pks = set()
+        for value in values:
+            try:
+                pks.add(self.to_pk(value))
+            except (DjangoValidationError, TypeError):
+                continue
+        self.prefetched = self.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        if self.prefetched is None:
+            return super().to_internal_value(data)
+        try:
+            obj = self.prefetched.get(self.to_pk(data))
+        except (DjangoValidationError, TypeError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
+class PrefetchedManyRelatedField(serializers.ManyRelatedField):
+
+    def to_internal_value(self, data):
+        if isinstance(data, (list, tuple)):
+            self.child_relation.prefetch(data)
+        return super().to_internal_value(data)
+
+
+class WriteRecipeIngredientListSerializer(serializers.ListSerializer):
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.child.fields['id'].prefetch(
+                item.get('id') for item in data if isinstance(item, Mapping))
+        return super().to_internal_value(data)
+
+
 class WriteRecipeIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор объектов типа RecipeIngredient на запись."""
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = PrefetchedPrimaryKeyRelatedField(queryset=Ingredient.objects.all())
     amount = serializers.IntegerField(
         min_value=MIN_AMOUNT, max_value=MAX_AMOUNT)
 
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = WriteRecipeIngredientListSerializer
+
+
+def image_url(name, request=None):
+    """URL картинки рецепта так же, как его выводит ImageField."""
+    if not name:
+        return None
+    url = Recipe._meta.get_field('image').storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
@@ -78,6 +176,50 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
 
+    @classmethod
+    def values_data(cls, queryset, request=None):
+        """Те же данные, что и у сериализатора, напрямую из .values()."""
+        return cls.rows_data(queryset.values(*cls.Meta.fields), request)
+
+    @staticmethod
+    def rows_data(rows, request=None):
+        return [
+            {
+                'id': recipe['id'],
+                'name': recipe['name'],
+                'image': image_url(recipe['image'], request),
+                'cooking_time': recipe['cooking_time'],
+            }
+            for recipe in rows
+        ]
+
+    @classmethod
+    def previews_query(cls, author_ids, limit):
+        parts = [
+            Recipe.objects.filter(
+                id__in=Recipe.objects.filter(author_id=author_id).order_by(
+                    '-pub_date').values('id')[:limit],
+            ).order_by().values('author_id', 'pub_date', *cls.Meta.fields)
+            for author_id in author_ids]
+        return parts[0].union(*parts[1:], all=True).order_by('-pub_date')
+
+    @classmethod
+    def previews_data(cls, author_ids, limit, request=None):
+        """Последние limit рецептов каждого автора одним запросом.
+
+        Запрос — UNION ALL частей по авторам: каждая берёт id
+        не больше limit рецептов по индексу (author, -pub_date),
+        сколько бы рецептов у автора ни было.
+        """
+        previews = {author_id: [] for author_id in author_ids}
+        if not limit or not author_ids:
+            return previews
+        for row in cls.previews_query(author_ids, limit):
+            previews[row['author_id']].append(row)
+        return {
+            author_id: cls.rows_data(recipes, request)
+            for author_id, recipes in previews.items()}
+
 
 class RecipeReadSerializer(serializers.ModelSerializer):
     """Сериализатор объектов типа Recipe. Чтение рецептов."""
@@ -90,15 +232,133 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = ('updated_at',)
 
     def get_ingredients(self, obj):
         """Получение ингредиентов."""
-        return obj.ingredients.values(
+        return list(obj.ingredients.values(
             'id',
             'name',
             'measurement_unit',
-            amount=F('recipe_ingredients__amount'))
+            amount=F('recipe_ingredients__amount')))
+
+    @classmethod
+    def values_data(cls, queryset, request=None):
+        """Те же данные, что и у сериализатора, напрямую из .values().
+
+        Три запроса на любое число рецептов; флаги пользователя
+        равны False и подставляются через with_user_flags.
+        """
+        recipes = list(queryset.values(
+            'id', 'pub_date', 'name', 'image', 'text', 'cooking_time',
+            'author_id', 'author__email', 'author__username',
+            'author__first_name', 'author__last_name'))
+        ids = [recipe['id'] for recipe in recipes]
+        tags = defaultdict(list)
+        for row in (Recipe.tags.through.objects.filter(recipe_id__in=ids)
+                    .order_by()
+                    .values('recipe_id', 'tag_id', 'tag__name',
+                            'tag__color', 'tag__slug')):
+            tags[row['recipe_id']].append({
+                'id': row['tag_id'],
+                'name': row['tag__name'],
+                'color': row['tag__color'],
+                'slug': row['tag__slug'],
+            })
+        ingredients = defaultdict(list)
+        for row in (RecipeIngredient.objects.filter(recipe_id__in=ids)
+                    .order_by()
+                    .values('recipe_id', 'ingredient_id', 'ingredient__name',
+                            'ingredient__measurement_unit', 'amount')):
+            ingredients[row['recipe_id']].append({
+                'id': row['ingredient_id'],
+                'name': row['ingredient__name'],
+                'measurement_unit': row['ingredient__measurement_unit'],
+                'amount': row['amount'],
+            })
+        return [
+            cls.recipe_data(
+                recipe, cls.by_name(tags[recipe['id']]),
+                cls.by_name(ingredients[recipe['id']]), request)
+            for recipe in recipes
+        ]
+
+    @staticmethod
+    def by_name(items):
+        """Теги или ингредиенты по имени (при равенстве — по id).
+
+        Сортировка в Python, а не ORDER BY: порядок не зависит
+        от правил сравнения строк БД и совпадает у values_data
+        и instance_data.
+        """
+        return sorted(items, key=itemgetter('name', 'id'))
+
+    @classmethod
+    def instance_data(cls, recipe, tags, ingredients, request=None):
+        """Те же данные по объектам в памяти, без запросов к БД.
+
+        ingredients — пары (ингредиент, количество).
+        """
+        author = recipe.author
+        return cls.recipe_data(
+            {
+                'id': recipe.id,
+                'pub_date': recipe.pub_date,
+                'name': recipe.name,
+                'image': recipe.image.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'author_id': author.id,
+                'author__email': author.email,
+                'author__username': author.username,
+                'author__first_name': author.first_name,
+                'author__last_name': author.last_name,
+            },
+            cls.by_name(
+                {'id': tag.id, 'name': tag.name, 'color': tag.color,
+                 'slug': tag.slug}
+                for tag in tags),
+            cls.by_name(
+                {'id': ingredient.id, 'name': ingredient.name,
+                 'measurement_unit': ingredient.measurement_unit,
+                 'amount': amount}
+                for ingredient, amount in ingredients),
+            request)
+
+    @staticmethod
+    def recipe_data(recipe, tags, ingredients, request=None):
+        return {
+            'id': recipe['id'],
+            'tags': tags,
+            'author': {
+                'email': recipe['author__email'],
+                'id': recipe['author_id'],
+                'username': recipe['author__username'],
+                'first_name': recipe['author__first_name'],
+                'last_name': recipe['author__last_name'],
+                'is_subscribed': False,
+            },
+            'ingredients': ingredients,
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'pub_date': serializers.DateTimeField().to_representation(
+                recipe['pub_date']),
+            'name': recipe['name'],
+            'image': image_url(recipe['image'], request),
+            'text': recipe['text'],
+            'cooking_time': recipe['cooking_time'],
+        }
+
+    @staticmethod
+    def with_user_flags(data, user_sets):
+        """Подставить флаги пользователя в общие для всех данные рецепта."""
+        data = dict(data)
+        data['author'] = dict(data['author'])
+        data['author']['is_subscribed'] = (
+            data['author']['id'] in user_sets['subscribed_ids'])
+        data['is_favorited'] = data['id'] in user_sets['favorited_ids']
+        data['is_in_shopping_cart'] = data['id'] in user_sets['cart_ids']
+        return data
 
     def get_is_favorited(self, data):
         request = self.context.get('request')
@@ -116,7 +376,7 @@ class RecipeWriteSerializer(
     """Сериализация объектов типа Recipes. Запись рецептов."""
 
     author = FoodgramUserSerializer(read_only=True)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = PrefetchedPrimaryKeyRelatedField(
         many=True, queryset=Tag.objects.all())
     ingredients = WriteRecipeIngredientSerializer(many=True)
     image = Base64ImageField()
@@ -147,7 +407,10 @@ class RecipeWriteSerializer(
 
     def validate(self, value):
         """Валидация ингредиентов при заполнении рецепта."""
-        ingredients = value['ingredients']
+        if 'tags' not in value:
+            raise serializers.ValidationError(
+                {'tags': 'Ошибка: минимально должен быть 1 тег.'})
+        ingredients = value.get('ingredients')
         if not ingredients:
             raise serializers.ValidationError(
                 'Ошибка: минимально должен быть 1 ингредиент.')
@@ -158,36 +421,107 @@ class RecipeWriteSerializer(
         return value
 
     @staticmethod
-    def add_ingredients_and_tags(instance, ingredients, tags):
-        """Добавление ингредиентов и тегов."""
-        instance.tags.set(tags)
-        RecipeIngredient.objects.bulk_create([
+    def add_ingredients_and_tags(instance, ingredients, tags, created,
+                                 added=None, updated=()):
+        """Добавление ингредиентов и тегов.
+
+        ingredients — все ингредиенты рецепта, по ним считаются итоги.
+        tags и added — новые теги и ингредиенты (по умолчанию все),
+        updated — записи RecipeIngredient с изменённым количеством.
+        Строки пишутся bulk-запросами без сигналов, поэтому итоги,
+        кэш, похожие рецепты и журнал изменений обновляются здесь же.
+        """
+        added = ingredients if added is None else added
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=instance, tag=tag) for tag in tags)
+        RecipeIngredient.objects.bulk_create(
             RecipeIngredient(
                 recipe=instance,
                 ingredient=ingredient['id'],
                 amount=ingredient['amount'],
-            ) for ingredient in ingredients])
-
+            ) for ingredient in added)
+        RecipeIngredient.objects.bulk_update(updated, ('amount',))
+        save_rollups(
+            [] if created else [instance.id],
+            [(instance.id, ingredient['id'].name,
+              ingredient['id'].measurement_unit, ingredient['amount'])
+             for ingredient in ingredients])
+        record([
+            *(recipe_tag_entry(instance.id, tag.id) for tag in tags),
+            *(recipe_ingredient_entry(
+                instance.id, ingredient['id'].id, ingredient['amount'])
+              for ingredient in added),
+            *(recipe_ingredient_entry(
+                instance.id, item.ingredient_id, item.amount)
+              for item in updated)])
+        invalidate_recipe(instance.id)
+        schedule_update_similar([instance.id], unique=not created)
+
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(
-            author=self.context.get('request').user, **validated_data)
-        self.add_ingredients_and_tags(recipe, ingredients, tags)
+        # Записи журнала о рецепте и его связях — одним запросом.
+        with batch():
+            recipe = Recipe.objects.create(
+                author=self.context.get('request').user, **validated_data)
+            self.add_ingredients_and_tags(recipe, ingredients, tags, True)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        instance.ingredients.clear()
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        self.add_ingredients_and_tags(instance, ingredients, tags)
-        return super().update(instance, validated_data)
+        previous_image = instance.image.name
+        recipe_tags = Recipe.tags.through.objects.filter(recipe=instance)
+        tag_ids = set(recipe_tags.values_list('tag_id', flat=True))
+        removed_tag_ids = tag_ids - {tag.id for tag in tags}
+        amounts = {ingredient['id'].id: ingredient['amount']
+                   for ingredient in ingredients}
+        recipe_ingredients = list(
+            RecipeIngredient.objects.filter(recipe=instance))
+        updated = []
+        for item in recipe_ingredients:
+            amount = amounts.get(item.ingredient_id, item.amount)
+            if amount != item.amount:
+                item.amount = amount
+                updated.append(item)
+        ingredient_ids = {item.ingredient_id for item in recipe_ingredients}
+        with batch():
+            recipe_tags.filter(tag_id__in=removed_tag_ids).delete()
+            record(recipe_tag_entry(instance.id, tag_id, deleted=True)
+                   for tag_id in removed_tag_ids)
+            # Журнал и кэш по удалённым ингредиентам ведут сигналы
+            # post_delete RecipeIngredient, итоги пересчитываются ниже.
+            with refresh_handled():
+                RecipeIngredient.objects.filter(
+                    recipe=instance,
+                    ingredient_id__in=ingredient_ids - amounts.keys(),
+                ).delete()
+            instance = super().update(instance, validated_data)
+            replace_image(previous_image, instance)
+            self.add_ingredients_and_tags(
+                instance, ingredients,
+                [tag for tag in tags if tag.id not in tag_ids], False,
+                added=[ingredient for ingredient in ingredients
+                       if ingredient['id'].id not in ingredient_ids],
+                updated=updated)
+        return instance
 
     def to_representation(self, instance):
-        serializer = RecipeReadSerializer(
-            instance=instance, context=self.context)
-        return serializer.data
+        """Ответ по проверенным данным запроса, без повторного чтения."""
+        if not hasattr(self, '_validated_data'):
+            return RecipeReadSerializer(
+                instance=instance, context=self.context).data
+        request = self.context.get('request')
+        data = RecipeReadSerializer.instance_data(
+            instance,
+            self.validated_data['tags'],
+            [(ingredient['id'], ingredient['amount'])
+             for ingredient in self.validated_data['ingredients']],
+            request)
+        return RecipeReadSerializer.with_user_flags(
+            data, get_user_sets(request.user))
 
 
 class BaseUserRecipeSerializer(serializers.ModelSerializer):
@@ -198,6 +532,8 @@ class BaseUserRecipeSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         request = self.context['request']
+        if request.method not in ('POST', 'DELETE'):
+            return data
         user = request.user
         is_exist = self.Meta.model.objects.filter(
             user=user, recipe=data['recipe']).exists()
@@ -212,7 +548,7 @@ class BaseUserRecipeSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         return ShortRecipeSerializer(
-            instance=instance, context=self.context).data
+            instance=instance.recipe, context=self.context).data
 
 
 class FavoriteSerializer(BaseUserRecipeSerializer):
@@ -226,10 +562,18 @@ class FavoriteSerializer(BaseUserRecipeSerializer):
 class ShoppingCartSerializer(BaseUserRecipeSerializer):
     """Сериализатор объектов типа ShoppingCart. Проверка списка покупок."""
 
+    multiplier = serializers.IntegerField(
+        min_value=MIN_MULTIPLIER, max_value=MAX_MULTIPLIER, required=False)
+
     class Meta(BaseUserRecipeSerializer.Meta):
         model = ShoppingCart
         fields = '__all__'
 
+    def to_representation(self, instance):
+        """Краткие данные рецепта и сохранённый множитель порций."""
+        return {**super().to_representation(instance),
+                'multiplier': instance.multiplier}
+
 
 class SubscribeSerializer(serializers.ModelSerializer):
     """Сериализатор объектов типа Subscription. Проверка подписки."""
@@ -267,18 +611,43 @@ class SubscriptionSerializer(FoodgramUserSerializer):
     """Сериализатор объектов типа Subscription. Подписки."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(source='recipes.count')
+    recipes_count = serializers.SerializerMethodField()
 
     class Meta(FoodgramUserSerializer.Meta):
         fields = (FoodgramUserSerializer.Meta.fields
                   + ('recipes', 'recipes_count'))
         read_only_fields = ('is_subscribed', 'recipes', 'recipes_count')
 
+    @staticmethod
+    def parse_recipes_limit(value):
+        """recipes_limit из запроса в пределах [0, MAX_RECIPES_PREVIEW]."""
+        try:
+            return min(max(int(value), 0), MAX_RECIPES_PREVIEW)
+        except (TypeError, ValueError):
+            return MAX_RECIPES_PREVIEW
+
     def get_recipes(self, obj):
-        """Получение рецептов автора."""
+        """Последние рецепты автора (не больше MAX_RECIPES_PREVIEW)."""
+        previews = self.context.get('recipes_previews')
+        if previews is not None:
+            return previews[obj.id]
         request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        queryset = obj.recipes.all()
-        if limit:
-            queryset = queryset[:int(limit)]
-        return ShortRecipeSerializer(queryset, many=True).data
+        limit = self.parse_recipes_limit(request.GET.get('recipes_limit'))
+        return ShortRecipeSerializer.values_data(
+            obj.recipes.all()[:limit], request)
+
+    def get_recipes_count(self, obj):
+        recipes_count = getattr(obj, 'recipes_count', None)
+        if recipes_count is None:
+            return obj.recipes.count()
+        return recipes_count
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Сериализатор объектов типа Job. Статус фоновой задачи."""
+
+    class Meta:
+        model = Job
+        fields = ('id', 'name', 'status', 'attempts', 'result', 'error',
+                  'created', 'finished')
+        read_only_fields = fields
@@ -0,0 +1,32 @@
+from django.db.models import BigIntegerField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Cast
+
+from foodgram_backend.constants import TITLE_SHOP_CART
+from recipes.models import ShoppingCart
+
+
+def get_cart_ingredients(user):
+    """Итоги ингредиентов списка покупок с учётом множителей порций."""
+    return (
+        ShoppingCart.objects.filter(
+            user=user, recipe__rollups__isnull=False)
+        .values(
+            name=F('recipe__rollups__name'),
+            measurement_unit=F('recipe__rollups__measurement_unit'))
+        .order_by('name')
+        # Произведение считается в bigint: amount и multiplier в int4,
+        # и 30 000 кг в граммах на множитель 100 его переполняют.
+        .annotate(total=Sum(ExpressionWrapper(
+            Cast('recipe__rollups__amount', BigIntegerField())
+            * F('multiplier'),
+            output_field=BigIntegerField())))
+    )
+
+
+def make_cart_text(ingredients):
+    return TITLE_SHOP_CART + '\n'.join(
+        f'{ingredient["name"]}'
+        f' ({ingredient["measurement_unit"]})'
+        f' - {ingredient["total"]};'
+        for ingredient in ingredients
+    )
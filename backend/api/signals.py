@@ -0,0 +1,64 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api import cache
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from recipes.signals import touch_recipes
+from users.models import Subscription, User
+
+USER_PUBLIC_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    cache.invalidate_recipe(instance.id)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    cache.invalidate_recipe(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        cache.invalidate_recipe(instance.id)
+    elif pk_set:
+        cache.invalidate(
+            cache.RECIPE_LIST_TAG, *map(cache.recipe_tag, pk_set))
+    else:
+        cache.invalidate(cache.RECIPE_LIST_TAG, cache.CATALOGUE_TAG)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def catalogue_changed(sender, **kwargs):
+    cache.invalidate(cache.CATALOGUE_TAG)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields
+                   and not USER_PUBLIC_FIELDS.intersection(update_fields)):
+        return
+    # Имя автора входит в данные его рецептов.
+    touch_recipes(instance.recipes.all())
+    cache.invalidate(cache.author_tag(instance.id), cache.RECIPE_LIST_TAG)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscription)
+def user_sets_changed(sender, instance, **kwargs):
+    cache.invalidate(cache.user_tag(instance.user_id))
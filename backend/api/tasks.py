@@ -0,0 +1,14 @@
+from api.shopping_cart import get_cart_ingredients, make_cart_text
+from foodgram_backend.constants import FILE_NAME
+from jobs.registry import register
+from users.models import User
+
+
+@register('api.export_shopping_cart')
+def export_shopping_cart(user_id):
+    """Сформировать файл списка покупок пользователя."""
+    return {
+        'filename': FILE_NAME,
+        'content': make_cart_text(
+            get_cart_ingredients(User.objects.get(pk=user_id))),
+    }
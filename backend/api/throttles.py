@@ -0,0 +1,59 @@
+from math import ceil
+
+from rest_framework.throttling import SimpleRateThrottle
+
+from foodgram_backend.constants import ROWS_PER_TOKEN
+
+
+def rows_cost(rows):
+    """Стоимость запроса в токенах по оценке числа читаемых строк."""
+    return max(1, ceil(rows / ROWS_PER_TOKEN))
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Троттлинг по алгоритму token bucket в общем кэше.
+
+    Область задаётся атрибутом throttle_scope представления, лимиты —
+    в DEFAULT_THROTTLE_RATES: ёмкость корзины равна числу запросов,
+    пополнение идёт равномерно за период. Это допускает короткие
+    всплески, но ограничивает средний поток запросов.
+
+    Запрос расходует столько токенов, сколько возвращает метод
+    get_request_cost(request) представления (по умолчанию один).
+    """
+
+    scope_attr = 'throttle_scope'
+
+    def __init__(self):
+        # Лимиты известны только после получения представления.
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+        get_cost = getattr(view, 'get_request_cost', None)
+        cost = min(get_cost(request) if get_cost else 1, self.num_requests)
+        now = self.timer()
+        tokens, updated = self.cache.get(self.key, (self.num_requests, now))
+        tokens = min(
+            self.num_requests,
+            tokens + (now - updated) * self.num_requests / self.duration)
+        self.shortage = cost - tokens
+        if self.shortage <= 0:
+            tokens -= cost
+        self.cache.set(self.key, (tokens, now), self.duration)
+        return self.shortage <= 0
+
+    def get_cache_key(self, request, view):
+        if request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def wait(self):
+        return self.shortage * self.duration / self.num_requests
@@ -1,8 +1,12 @@
-from django.urls import include, path
+from django.conf import settings
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
+from api import async_views
 from api.views import (
+    ChangeViewSet,
     IngredientViewSet,
+    JobViewSet,
     RecipeViewSet,
     TagViewSet,
     UserSubscriptionViewSet,
@@ -10,7 +14,9 @@ from api.views import (
 
 router = DefaultRouter()
 
+router.register('changes', ChangeViewSet, basename='changes')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
+router.register('jobs', JobViewSet, basename='jobs')
 router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('tags', TagViewSet, basename='tags')
 router.register('users', UserSubscriptionViewSet, basename='users')
@@ -19,3 +25,19 @@ urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # Имена совпадают с маршрутами роутера. Id только из цифр, иначе
+    # маршрут перехватил бы действия вьюсетов (recipes/recommended/ и т.п.).
+    urlpatterns = [
+        path('recipes/', async_views.recipe_list, name='recipes-list'),
+        re_path(r'^recipes/(?P<pk>\d+)/$', async_views.recipe_detail,
+                name='recipes-detail'),
+        path('tags/', async_views.tag_list, name='tags-list'),
+        re_path(r'^tags/(?P<pk>\d+)/$', async_views.tag_detail,
+                name='tags-detail'),
+        path('ingredients/', async_views.ingredient_list,
+             name='ingredients-list'),
+        re_path(r'^ingredients/(?P<pk>\d+)/$', async_views.ingredient_detail,
+                name='ingredients-detail'),
+    ] + urlpatterns
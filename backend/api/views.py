@@ -1,17 +1,38 @@
-from django.db.models import Sum
-from django.http import FileResponse
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import (
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import redirect
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import status, viewsets
+from rest_framework import serializers, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import (
     SAFE_METHODS,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 
+from api import cache
+from api.catalogue import choose_encoding, get_snapshot
+from api.concurrency import run_concurrently
 from api.filters import IngredientFilter, RecipeFilter
 from api.paginations import LimitPageNumberPagination
 from api.permissions import IsAuthor
@@ -19,23 +40,41 @@ from api.serializers import (
     FavoriteSerializer,
     FoodgramUserSerializer,
     IngredientSerializer,
+    JobSerializer,
     RecipeReadSerializer,
     RecipeWriteSerializer,
     ShoppingCartSerializer,
+    ShortRecipeSerializer,
     SubscribeSerializer,
     SubscriptionSerializer,
     TagSerializer,
 )
-from foodgram_backend.constants import FILE_NAME, TITLE_SHOP_CART
+from api.shopping_cart import get_cart_ingredients, make_cart_text
+from api.throttles import rows_cost
+from changes.log import changes_since, last_change, parse_cursor
+from foodgram_backend.constants import (
+    CACHED_QUERY_PARAMS,
+    CART_ROWS_PER_RECIPE,
+    CATALOGUE_SNAPSHOT_MAX_AGE,
+    CHANGES_PAGE_SIZE,
+    FILE_NAME,
+    MIN_MULTIPLIER,
+    RECOMMENDED_RECIPES_COUNT,
+    REQUEST_ROWS_BUDGET,
+)
+from foodgram_backend.counting import aggregate_subquery, count_subquery
+from jobs.registry import enqueue
 from recipes.models import (
     Favorite,
     Ingredient,
     Recipe,
     RecipeIngredient,
+    RecipeNeighbor,
+    RecipeRecommendation,
     ShoppingCart,
     Tag,
 )
-from users.models import User
+from users.models import Subscription, User
 
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
@@ -49,6 +88,53 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = IngredientSerializer
     pagination_class = None
     filterset_class = IngredientFilter
+    throttle_scope = 'autocomplete'
+
+    @staticmethod
+    def snapshot_url(request, version):
+        return reverse(
+            'ingredients-snapshot-version', args=(version,), request=request)
+
+    @action(detail=False, methods=['get'])
+    def snapshot(self, request):
+        """Версия и URL снимка каталога для автодополнения на клиенте."""
+        snapshot = get_snapshot()
+        etag = f'"{snapshot["version"]}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response({
+                'version': snapshot['version'],
+                'count': snapshot['count'],
+                'url': self.snapshot_url(request, snapshot['version']),
+            })
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'snapshot/(?P<version>[0-9a-f]+)',
+        url_name='snapshot-version',
+    )
+    def snapshot_version(self, request, version):
+        """Снимок каталога; содержимое версии не меняется."""
+        snapshot = get_snapshot()
+        if version != snapshot['version']:
+            return redirect(self.snapshot_url(request, snapshot['version']))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            snapshot['encodings'])
+        response = HttpResponse(
+            snapshot['encodings'][encoding], content_type='application/json')
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+        response['ETag'] = f'"{version}"'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        patch_cache_control(
+            response, public=True, max_age=CATALOGUE_SNAPSHOT_MAX_AGE,
+            immutable=True)
+        return response
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -59,15 +145,282 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthor)
     filterset_class = RecipeFilter
     filter_backends = (DjangoFilterBackend,)
+    throttle_scope = None
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def get_queryset(self):
+        if self.request.method in SAFE_METHODS:
+            return super().get_queryset()
+        # Запись заменяет теги и ингредиенты целиком: загружать их незачем.
+        # Автора IsAuthor сверяет по author_id, без соединения с users.
+        return Recipe.objects.all()
+
+    def get_object(self):
+        """Рецепт по id; для записи — одним запросом без соединений.
+
+        Проверка IsAuthor выполняется до загрузки автора: несуществующий
+        рецепт (404) и чужой рецепт (403) стоят одного запроса по
+        первичному ключу. Автор рецепта, который прошёл проверку, —
+        текущий пользователь, он подставляется без запроса.
+        """
+        recipe = super().get_object()
+        if self.request.method not in SAFE_METHODS:
+            recipe.author = self.request.user
+        return recipe
+
+    def get_cache_key(self, request, *parts):
+        """Ключ кэша ответа для анонимного пользователя.
+
+        Параметры запроса нормализуются по порядку имён. Запросы
+        с другими параметрами не кэшируются: они попадают в ссылки
+        next/previous и меняли бы ответ.
+        """
+        if not request.user.is_anonymous:
+            return None
+        params = request.query_params
+        if set(params) - set(CACHED_QUERY_PARAMS):
+            return None
+        return cache.make_key(
+            self.action, request.build_absolute_uri('/'), *parts,
+            *(f'{name}={params.getlist(name)}' for name in sorted(params)))
+
+    def get_request_cost(self, request):
+        """Стоимость запроса для троттлинга (см. TokenBucketThrottle)."""
+        if self.action == 'download_shopping_cart':
+            return rows_cost(
+                min(self.get_cart_rows(request), REQUEST_ROWS_BUDGET))
+        return 1
+
     @staticmethod
-    def add_recipe(model_serializer, request, id):
-        data = {'user': request.user.id, 'recipe': id}
+    def get_cart_rows(request):
+        """Оценка числа строк списка покупок без запроса к БД."""
+        user_sets = cache.get_user_sets(request.user)
+        return len(user_sets['cart_ids']) * CART_ROWS_PER_RECIPE
+
+    def get_count_cache_tags(self):
+        """Группы инвалидации кэша количества рецептов в выборке."""
+        tags = [cache.RECIPE_LIST_TAG, cache.CATALOGUE_TAG]
+        if self.request.user.is_authenticated:
+            tags.append(cache.user_tag(self.request.user.id))
+        return tags
+
+    def get_recipes_data(self, request, recipe_ids):
+        """Данные рецептов с флагами текущего пользователя.
+
+        Общие для всех пользователей данные рецепта кэшируются по его id,
+        флаги is_favorited/is_in_shopping_cart/is_subscribed подставляются
+        из кэшированных множеств id пользователя.
+        """
+        return self.with_user_flags(
+            request, lambda: self.get_fragments(request, recipe_ids))
+
+    def with_user_flags(self, request, get_fragments):
+        """Фрагменты get_fragments() с флагами текущего пользователя.
+
+        Фрагменты и множества id пользователя не зависят друг от друга:
+        под асинхронными представлениями они загружаются параллельно.
+        """
+        if request.user.is_anonymous:
+            fragments = get_fragments()
+            user_sets = cache.get_user_sets(request.user)
+        else:
+            fragments, user_sets = run_concurrently(
+                get_fragments, lambda: cache.get_user_sets(request.user))
+        return [
+            RecipeReadSerializer.with_user_flags(fragment, user_sets)
+            for fragment in fragments]
+
+    def get_fragments(self, request, recipe_ids):
+        """Общие данные рецептов в порядке recipe_ids (из кэша или БД)."""
+        host = request.build_absolute_uri('/')
+        keys = {
+            recipe_id: cache.make_key('recipe', host, recipe_id)
+            for recipe_id in recipe_ids}
+        cached = cache.get_many_responses(keys.values())
+        fragments = {
+            recipe_id: cached[key]
+            for recipe_id, key in keys.items() if key in cached}
+        missing = [
+            recipe_id for recipe_id in keys if recipe_id not in fragments]
+        if missing:
+            fragments.update(self.make_fragments(request, keys, missing))
+        return [fragments[recipe_id]
+                for recipe_id in recipe_ids if recipe_id in fragments]
+
+    def make_fragments(self, request, keys, recipe_ids):
+        versions = cache.get_tag_versions(
+            (cache.CATALOGUE_TAG, *map(cache.recipe_tag, recipe_ids)))
+        fragments = {
+            fragment['id']: fragment
+            for fragment in RecipeReadSerializer.values_data(
+                Recipe.objects.filter(id__in=recipe_ids), request)}
+        versions.update(cache.get_tag_versions({
+            cache.author_tag(fragment['author']['id'])
+            for fragment in fragments.values()}))
+        cache.set_many_responses({
+            keys[recipe_id]: (
+                {tag: versions[tag] for tag in (
+                    cache.CATALOGUE_TAG,
+                    cache.recipe_tag(recipe_id),
+                    cache.author_tag(fragment['author']['id']))},
+                fragment)
+            for recipe_id, fragment in fragments.items()})
+        return fragments
+
+    @staticmethod
+    def get_state(request, queryset, *fields):
+        """Значения fields первой строки queryset для ETag, одним запросом.
+
+        Для пользователя добавляется последняя его личная запись журнала
+        изменений (избранное, список покупок, подписки): состояние
+        берётся из БД и не зависит от кэша процесса.
+        """
+        if request.user.is_authenticated:
+            queryset = queryset.annotate(
+                user_change=Subquery(last_change(request.user)))
+            fields += ('user_change',)
+        return queryset.values_list(*fields).first()
+
+    def get_list_state(self, request):
+        """Состояние рецептов в БД для ETag списка.
+
+        Список меняется и при удалении рецепта, поэтому Last-Modified
+        (наибольший updated_at) ему не подходит. Последняя общая запись
+        журнала изменений меняется при добавлении, изменении и удалении
+        рецептов, их тегов и ингредиентов, наибольший updated_at —
+        при обновлении рецептов без записи в журнал (touch_recipes).
+        """
+        return self.get_state(
+            request,
+            Recipe.objects.order_by('-updated_at').annotate(
+                last_change=Subquery(last_change())),
+            'updated_at', 'last_change') or ()
+
+    def get_validators(self, request, updated_at, *parts):
+        """ETag и Last-Modified ответа без сериализации рецептов.
+
+        ETag учитывает состояние пользователя (избранное, список покупок,
+        подписки; см. get_state), поэтому Last-Modified отдаётся только
+        анонимам и только если updated_at задан.
+        """
+        state = [request.build_absolute_uri('/'), updated_at, *parts]
+        if request.user.is_anonymous:
+            last_modified = updated_at and int(updated_at.timestamp())
+        else:
+            last_modified = None
+            state.append(request.user.id)
+        return f'"{cache.make_key(*state)}"', last_modified
+
+    @staticmethod
+    def conditional_response(request, validators, get_data):
+        """Ответ 304, если данные клиента актуальны, иначе get_data()."""
+        etag, last_modified = validators
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(get_data())
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        cached = key and cache.get_response(key)
+        if cached:
+            validators, data = cached
+            return self.conditional_response(
+                request, validators, lambda: data)
+        versions = key and cache.get_tag_versions(
+            (cache.RECIPE_LIST_TAG, cache.CATALOGUE_TAG))
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = self.get_validators(
+            request, None, request.get_full_path(),
+            *self.get_list_state(request))
+
+        def get_data():
+            data = self.get_paginated_response(self.with_user_flags(
+                request, lambda: self.get_fragments(
+                    request, self.paginate_queryset(
+                        queryset.values_list('id', flat=True))))).data
+            if key:
+                cache.set_response(key, (validators, data), versions)
+            return data
+
+        return self.conditional_response(request, validators, get_data)
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+        if not pk.isdigit():
+            raise Http404
+        key = self.get_cache_key(request, int(pk))
+        cached = key and cache.get_response(key)
+        if cached:
+            validators, data = cached
+            return self.conditional_response(
+                request, validators, lambda: data)
+        versions = key and cache.get_tag_versions(
+            (cache.recipe_tag(int(pk)), cache.CATALOGUE_TAG))
+        state = self.get_state(
+            request, Recipe.objects.filter(pk=pk), 'updated_at')
+        if state is None:
+            raise Http404
+        validators = self.get_validators(request, *state)
+
+        def get_data():
+            recipes = self.get_recipes_data(request, [int(pk)])
+            if not recipes:
+                raise Http404
+            if key:
+                versions.update(cache.get_tag_versions(
+                    (cache.author_tag(recipes[0]['author']['id']),)))
+                cache.set_response(key, (validators, recipes[0]), versions)
+            return recipes[0]
+
+        return self.conditional_response(request, validators, get_data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Похожие рецепты по ингредиентам и тегам."""
+        if not pk.isdigit():
+            raise Http404
+        recipe_ids = list(RecipeNeighbor.objects.filter(
+            recipe_id=pk).order_by('-score').values_list(
+                'neighbor_id', flat=True))
+        if not recipe_ids and not Recipe.objects.filter(pk=pk).exists():
+            raise Http404
+        return Response(self.get_recipes_data(request, recipe_ids))
+
+    @action(detail=False, methods=['get'])
+    def recommended(self, request):
+        """Рекомендации пользователю, дополненные популярными рецептами.
+
+        Рецепты, уже отмеченные пользователем после пересчёта
+        рекомендаций, пропускаются.
+        """
+        user_sets = cache.get_user_sets(request.user)
+        seen = user_sets['favorited_ids'] | user_sets['cart_ids']
+        recipe_ids = []
+        for recipe_id in RecipeRecommendation.objects.filter(
+                Q(user_id=request.user.id) | Q(user__isnull=True)).order_by(
+                    F('user').asc(nulls_last=True),
+                    '-score').values_list('recipe_id', flat=True):
+            if recipe_id not in seen:
+                seen.add(recipe_id)
+                recipe_ids.append(recipe_id)
+                if len(recipe_ids) == RECOMMENDED_RECIPES_COUNT:
+                    break
+        return Response(self.get_recipes_data(request, recipe_ids))
+
+    @staticmethod
+    @transaction.atomic
+    def add_recipe(model_serializer, request, id, **extra):
+        data = {'user': request.user.id, 'recipe': id, **extra}
         serializer = model_serializer(data=data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         serializer.save()
@@ -109,9 +462,23 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.add_recipe(
             model_serializer=ShoppingCartSerializer,
             request=request,
-            id=pk
+            id=pk,
+            multiplier=request.data.get('multiplier', MIN_MULTIPLIER),
         )
 
+    @shopping_cart.mapping.patch
+    @transaction.atomic
+    def update_shopping_cart(self, request, pk=None):
+        """Изменить множитель порций рецепта в списке покупок."""
+        serializer = ShoppingCartSerializer(
+            get_object_or_404(ShoppingCart, user=request.user, recipe=pk),
+            data={'multiplier': request.data.get('multiplier')},
+            partial=True,
+            context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
     @shopping_cart.mapping.delete
     def del_shopping_cart(self, request, pk=None):
         """Удалить из списка покупок."""
@@ -122,35 +489,78 @@ class RecipeViewSet(viewsets.ModelViewSet):
             id=pk
         )
 
-    @staticmethod
-    def send_shopping_cart(ingredients):
-        result = TITLE_SHOP_CART
-        result += '\n'.join(
-            f'{ingredient["ingredient__name"]}'
-            f' ({ingredient["ingredient__measurement_unit"]})'
-            f' - {ingredient["total"]};'
-            for ingredient in ingredients
-        )
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=(IsAuthenticated,),
+        throttle_scope='shopping_cart',
+    )
+    def download_shopping_cart(self, request):
+        """Скачать список покупок.
+
+        Слишком большой список формируется в фоновой задаче
+        (POST export_shopping_cart): GET задач не создаёт.
+        """
+        if self.get_cart_rows(request) > REQUEST_ROWS_BUDGET:
+            url = reverse('recipes-export-shopping-cart', request=request)
+            return Response(
+                {'detail': 'Ошибка: список покупок слишком большой, '
+                           f'сформируйте его запросом POST {url}'},
+                status=status.HTTP_409_CONFLICT)
         return FileResponse(
-            result,
+            make_cart_text(get_cart_ingredients(request.user)),
             content_type='text/plain',
             as_attachment=True,
             filename=FILE_NAME)
 
     @action(
         detail=False,
-        methods=['get'],
-        permission_classes=(IsAuthenticated,)
+        methods=['post'],
+        permission_classes=(IsAuthenticated,),
+        throttle_scope='shopping_cart',
     )
-    def download_shopping_cart(self, request):
-        """Скачать список покупок."""
-        ingredients = (RecipeIngredient.objects.filter(
-            recipe__shoppingcarts__user=request.user)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .order_by('ingredient__name')
-            .annotate(total=Sum('amount'))
-        )
-        return self.send_shopping_cart(ingredients)
+    def export_shopping_cart(self, request):
+        """Сформировать список покупок в фоновой задаче.
+
+        Пока задача пользователя ждёт в очереди, повторный запрос
+        возвращает её, а не ставит новую.
+        """
+        job = enqueue(
+            'api.export_shopping_cart',
+            user=request.user,
+            unique=True,
+            user_id=request.user.id)
+        return Response(
+            JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Вьюсет для просмотра статуса и результата фоновых задач."""
+
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return self.request.user.jobs.all()
+
+
+class ChangeViewSet(viewsets.ViewSet):
+    """Журнал изменений для инкрементальной синхронизации.
+
+    GET /api/changes/?since=<cursor> — изменения после курсора
+    (без since — с начала журнала) и курсор для следующего запроса.
+    """
+
+    def list(self, request):
+        try:
+            cursor = parse_cursor(request.query_params.get('since', '0.0'))
+        except ValueError:
+            raise serializers.ValidationError(
+                {'since': 'Ошибка: неверный курсор.'})
+        changes, cursor, has_more = changes_since(
+            cursor, request.user, CHANGES_PAGE_SIZE)
+        return Response(
+            {'cursor': cursor, 'has_more': has_more, 'changes': changes})
 
 
 class UserSubscriptionViewSet(UserViewSet):
@@ -160,6 +570,7 @@ class UserSubscriptionViewSet(UserViewSet):
     serializer_class = FoodgramUserSerializer
     pagination_class = LimitPageNumberPagination
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    throttle_scope = None
 
     def get_permissions(self):
         """Получить информацию о текущем пользователе 'api/users/me/'."""
@@ -167,8 +578,66 @@ class UserSubscriptionViewSet(UserViewSet):
             self.permission_classes = (IsAuthenticated,)
         return super().get_permissions()
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.annotate(is_subscribed=Value(False))
+        return queryset.annotate(is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef('pk'))))
+
+    @action(['get', 'put', 'patch', 'delete'], detail=False)
+    def me(self, request, *args, **kwargs):
+        """Текущий пользователь; ответ на GET кэшируется."""
+        if request.method != 'GET':
+            return super().me(request, *args, **kwargs)
+        key = cache.make_key('me', request.user.id)
+        data = cache.get_response(key)
+        if data is None:
+            versions = cache.get_tag_versions((
+                cache.user_tag(request.user.id),
+                cache.author_tag(request.user.id)))
+            data = super().me(request, *args, **kwargs).data
+            cache.set_response(key, data, versions)
+        return Response(data)
+
+    @action(
+        detail=False, methods=['get'], url_path='me/summary',
+        permission_classes=(IsAuthenticated,))
+    def summary(self, request):
+        """Итоги текущего пользователя одним запросом; ответ кэшируется.
+
+        Кэш сбрасывается при изменении избранного, списка покупок
+        и подписок, а также рецептов из списка покупок.
+        """
+        user = request.user
+        key = cache.make_key('summary', user.id)
+        data = cache.get_response(key)
+        if data is not None:
+            return Response(data)
+        cart_ids = cache.get_user_sets(user)['cart_ids']
+        versions = cache.get_tag_versions((
+            cache.user_tag(user.id), *map(cache.recipe_tag, cart_ids)))
+        data = User.objects.filter(pk=user.id).values(
+            favorites_count=count_subquery(Favorite.objects, 'user'),
+            shopping_cart_count=count_subquery(
+                ShoppingCart.objects, 'user'),
+            shopping_cart_ingredients_count=aggregate_subquery(
+                RecipeIngredient.objects, 'recipe__shoppingcarts__user',
+                Count('ingredient', distinct=True)),
+            shopping_cart_cooking_time=aggregate_subquery(
+                Recipe.objects, 'shoppingcarts__user', Sum('cooking_time')),
+            subscriptions_count=count_subquery(
+                Subscription.objects, 'user'),
+        ).get()
+        cache.set_response(key, data, versions)
+        return Response(data)
+
     @action(
         detail=True, methods=['post'], permission_classes=(IsAuthenticated,))
+    @transaction.atomic
     def subscribe(self, request, id=None):
         """Подписаться на автора."""
         user = request.user
@@ -194,13 +663,51 @@ class UserSubscriptionViewSet(UserViewSet):
         user.follower.filter(author=author).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def get_recipes_limit(self, request):
+        """recipes_limit из запроса, урезанный до бюджета строк страницы."""
+        page_size = self.paginator.get_page_size(request)
+        return min(
+            SubscriptionSerializer.parse_recipes_limit(
+                request.query_params.get('recipes_limit')),
+            max(REQUEST_ROWS_BUDGET // page_size - 1, 0))
+
+    def get_request_cost(self, request):
+        """Стоимость запроса для троттлинга (см. TokenBucketThrottle)."""
+        if self.action != 'subscriptions':
+            return 1
+        page_size = self.paginator.get_page_size(request)
+        return rows_cost(page_size * (1 + self.get_recipes_limit(request)))
+
+    def get_count_cache_tags(self):
+        """Группы инвалидации кэша количества (см. CheapCountPaginator)."""
+        if self.action == 'recipes':
+            return [cache.RECIPE_LIST_TAG]
+        return None
+
     @action(
-        detail=False, methods=['get'], permission_classes=(IsAuthenticated,))
+        detail=False, methods=['get'], permission_classes=(IsAuthenticated,),
+        throttle_scope='subscriptions')
     def subscriptions(self, request):
         """Подписки."""
         user = request.user
-        queryset = User.objects.filter(following__user=user)
+        queryset = User.objects.filter(following__user=user).annotate(
+            is_subscribed=Value(True),
+            recipes_count=count_subquery(Recipe.objects, 'author'))
         pages = self.paginate_queryset(queryset)
         serializer = SubscriptionSerializer(
-            pages, many=True, context={'request': request})
+            pages, many=True, context={
+                'request': request,
+                'recipes_previews': ShortRecipeSerializer.previews_data(
+                    [author.id for author in pages],
+                    self.get_recipes_limit(request), request),
+            })
         return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def recipes(self, request, id=None):
+        """Все рецепты автора постранично."""
+        author = get_object_or_404(User, pk=id)
+        page = self.paginate_queryset(author.recipes.values(
+            *ShortRecipeSerializer.Meta.fields))
+        return self.get_paginated_response(
+            ShortRecipeSerializer.rows_data(page, request))
@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from changes.models import Change
+from foodgram_backend.admin_utils import EstimatedCountPaginator
+
+
+@admin.register(Change)
+class ChangeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'txid', 'kind', 'key', 'user', 'created')
+    list_filter = ('kind',)
+    list_select_related = ('user',)
+    search_fields = ('key',)
+    readonly_fields = ('txid', 'kind', 'key', 'user', 'data', 'created')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
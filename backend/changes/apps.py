@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class ChangesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'changes'
+    verbose_name = 'Журнал изменений'
+    verbose_name_plural = 'Журнал изменений'
+
+    def ready(self):
+        import changes.signals  # noqa: F401
@@ -0,0 +1,185 @@
+"""Журнал изменений для инкрементальной синхронизации клиентов.
+
+Записи пишутся в той же транзакции, что и изменения. Курсор —
+пара (номер транзакции, id записи). На Postgres записи отдаются
+только из транзакций младше горизонта xmin текущего снимка:
+все они уже завершены, поэтому запись с меньшим курсором не может
+появиться после того, как клиент прочитал записи дальше неё.
+На SQLite транзакции записи идут строго по очереди, номер
+транзакции всегда 0 и порядок задаёт id.
+
+Ключи составных объектов: «рецепт-тег», «рецепт-ингредиент»,
+«пользователь-рецепт», «пользователь-автор». Удаление рецепта
+или тега удаляет на клиенте и его связи с тегами.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections, transaction
+from django.db.models import BigIntegerField, Exists, Func, OuterRef, Q
+from django.db.models.expressions import RawSQL
+
+from changes.models import Change
+from foodgram_backend.constants import CHANGES_COMPACT_BATCH
+
+CURSOR_SEPARATOR = '.'
+
+
+def is_postgresql(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def current_txid():
+    if is_postgresql():
+        return Func(function='txid_current', output_field=BigIntegerField())
+    return 0
+
+
+# Записи, которые batch() запишет одним запросом (иначе None).
+pending_entries = ContextVar('pending_entries', default=None)
+
+
+def write(entries):
+    Change.objects.bulk_create(
+        Change(txid=current_txid(), kind=kind, key=str(key), data=data,
+               user_id=user_id)
+        for kind, key, data, user_id in entries)
+
+
+def record(entries):
+    """Записать изменения: кортежи (kind, key, data, user_id).
+
+    data=None — удаление объекта. Внутри batch() записи копятся
+    и пишутся при выходе из него.
+    """
+    pending = pending_entries.get()
+    if pending is None:
+        write(entries)
+    else:
+        pending.extend(entries)
+
+
+@contextmanager
+def batch():
+    """Записать изменения, сделанные внутри блока, одним запросом.
+
+    Блок должен выполняться в транзакции изменений: при ошибке
+    записи журнала отбрасываются вместе с ней.
+    """
+    if pending_entries.get() is not None:
+        yield
+        return
+    pending = []
+    token = pending_entries.set(pending)
+    try:
+        yield
+    finally:
+        pending_entries.reset(token)
+    write(pending)
+
+
+def recipe_entry(recipe, deleted=False):
+    return (Change.RECIPE, recipe.id, None if deleted else {
+        'author': recipe.author_id,
+        'name': recipe.name,
+        'text': recipe.text,
+        'image': recipe.image.url if recipe.image else None,
+        'cooking_time': recipe.cooking_time,
+        'pub_date': recipe.pub_date,
+    }, None)
+
+
+def recipe_tag_entry(recipe_id, tag_id, deleted=False):
+    return (Change.RECIPE_TAG, f'{recipe_id}-{tag_id}', None if deleted else {
+        'recipe': recipe_id, 'tag': tag_id}, None)
+
+
+def recipe_ingredient_entry(recipe_id, ingredient_id, amount=None):
+    """Запись об ингредиенте рецепта; amount=None — удаление."""
+    return (
+        Change.RECIPE_INGREDIENT, f'{recipe_id}-{ingredient_id}',
+        None if amount is None else {
+            'recipe': recipe_id, 'ingredient': ingredient_id,
+            'amount': amount},
+        None)
+
+
+def last_change(user=None):
+    """Id последней записи журнала: общей или личной записи user.
+
+    Журнал не убывает: сжатие оставляет последнюю запись объекта.
+    """
+    return Change.objects.filter(user=user).order_by('-id').values_list(
+        'id', flat=True)[:1]
+
+
+def parse_cursor(value):
+    """Курсор из строки 'txid.id'; ValueError, если формат неверен."""
+    txid, _, change_id = value.partition(CURSOR_SEPARATOR)
+    txid, change_id = int(txid), int(change_id)
+    if txid < 0 or change_id < 0:
+        raise ValueError(value)
+    return txid, change_id
+
+
+def format_cursor(txid, change_id):
+    return f'{txid}{CURSOR_SEPARATOR}{change_id}'
+
+
+def after(txid, change_id, prefix=''):
+    """Условие «запись позже курсора»."""
+    return (Q(**{f'{prefix}txid__gt': txid})
+            | Q(**{f'{prefix}txid': txid, f'{prefix}id__gt': change_id}))
+
+
+def changes_since(cursor, user, limit):
+    """Не больше limit завершённых изменений после курсора.
+
+    Изменения одного объекта внутри выборки схлопываются в последнее.
+    Возвращает (изменения, курсор для следующего запроса, есть ли ещё).
+    """
+    queryset = Change.objects.filter(after(*cursor))
+    if is_postgresql(queryset.db):
+        queryset = queryset.filter(txid__lt=RawSQL(
+            'txid_snapshot_xmin(txid_current_snapshot())', ()))
+    if user.is_anonymous:
+        queryset = queryset.filter(user__isnull=True)
+    else:
+        queryset = queryset.filter(Q(user__isnull=True) | Q(user=user))
+    rows = list(queryset.order_by('txid', 'id').values_list(
+        'txid', 'id', 'kind', 'key', 'data')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        cursor = rows[-1][:2]
+    latest = {}
+    for _, _, kind, key, data in rows:
+        latest.pop((kind, key), None)
+        latest[kind, key] = data
+    return (
+        [{'kind': kind, 'key': key, 'data': data}
+         for (kind, key), data in latest.items()],
+        format_cursor(*cursor),
+        has_more)
+
+
+def compact(batch_size=CHANGES_COMPACT_BATCH):
+    """Удалить записи, у объекта которых есть запись новее.
+
+    Клиент с любым курсором всё равно получит последнее состояние
+    объекта, поэтому синхронизация остаётся O(изменений). Журнал
+    обходится блоками по id, каждый блок — отдельная транзакция.
+    Возвращает число удалённых записей.
+    """
+    newer = Change.objects.filter(
+        after(OuterRef('txid'), OuterRef('id')),
+        kind=OuterRef('kind'), key=OuterRef('key'))
+    last_id = Change.objects.order_by('-id').values_list(
+        'id', flat=True).first() or 0
+    deleted = 0
+    for start in range(0, last_id, batch_size):
+        with transaction.atomic():
+            deleted += Change.objects.filter(
+                id__gt=start, id__lte=start + batch_size).filter(
+                    Exists(newer)).delete()[0]
+    return deleted
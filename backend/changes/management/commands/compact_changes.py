@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from changes.log import compact
+from foodgram_backend.constants import CHANGES_COMPACT_BATCH
+
+
+class Command(BaseCommand):
+    help = 'сжатие журнала изменений (удаление устаревших записей)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=CHANGES_COMPACT_BATCH)
+
+    def handle(self, *args, **options):
+        deleted = compact(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'***** Удалено записей журнала: {deleted}'))
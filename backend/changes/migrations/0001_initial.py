@@ -0,0 +1,43 @@
+# Generated by Django 3.2.3 on 2026-10-19 10:00
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('txid', models.BigIntegerField(default=0, verbose_name='номер транзакции')),
+                ('kind', models.CharField(choices=[('recipe', 'рецепт'), ('recipe_tag', 'тег рецепта'), ('recipe_ingredient', 'ингредиент рецепта'), ('tag', 'тег'), ('ingredient', 'ингредиент'), ('favorite', 'избранное'), ('shopping_cart', 'список покупок'), ('subscription', 'подписка')], max_length=17, verbose_name='тип объекта')),
+                ('key', models.CharField(max_length=64, verbose_name='ключ объекта')),
+                ('data', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='данные')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='дата')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'изменение',
+                'verbose_name_plural': 'изменения',
+                'ordering': ('txid', 'id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['txid', 'id'], name='change_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['kind', 'key', 'txid', 'id'], name='change_object_idx'),
+        ),
+    ]
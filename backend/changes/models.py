@@ -0,0 +1,82 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from foodgram_backend.constants import CHANGE_KEY_LIMIT
+from users.models import User
+
+
+class Change(models.Model):
+    """Модель записи журнала изменений.
+
+    Запись без данных (data is None) — удаление объекта. Записи
+    о личных данных (избранное, список покупок, подписки) видит
+    только их пользователь.
+    """
+
+    RECIPE = 'recipe'
+    RECIPE_TAG = 'recipe_tag'
+    RECIPE_INGREDIENT = 'recipe_ingredient'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shopping_cart'
+    SUBSCRIPTION = 'subscription'
+    KINDS = (
+        (RECIPE, 'рецепт'),
+        (RECIPE_TAG, 'тег рецепта'),
+        (RECIPE_INGREDIENT, 'ингредиент рецепта'),
+        (TAG, 'тег'),
+        (INGREDIENT, 'ингредиент'),
+        (FAVORITE, 'избранное'),
+        (SHOPPING_CART, 'список покупок'),
+        (SUBSCRIPTION, 'подписка'),
+    )
+
+    txid = models.BigIntegerField(
+        default=0,
+        verbose_name='номер транзакции',
+    )
+    kind = models.CharField(
+        max_length=max(len(kind) for kind, _ in KINDS),
+        choices=KINDS,
+        verbose_name='тип объекта',
+    )
+    key = models.CharField(
+        max_length=CHANGE_KEY_LIMIT,
+        verbose_name='ключ объекта',
+    )
+    # Без ограничения FK: при удалении пользователя каскад пишет в журнал
+    # удаления его избранного и подписок со ссылкой на него.
+    user = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='пользователь'
+    )
+    data = models.JSONField(
+        null=True,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name='данные',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='дата',
+    )
+
+    class Meta:
+        ordering = ('txid', 'id')
+        verbose_name = 'изменение'
+        verbose_name_plural = 'изменения'
+        indexes = [
+            models.Index(fields=('txid', 'id'), name='change_cursor_idx'),
+            models.Index(
+                fields=('kind', 'key', 'txid', 'id'),
+                name='change_object_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.key}'
@@ -0,0 +1,101 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from changes.log import (
+    recipe_entry,
+    recipe_ingredient_entry,
+    recipe_tag_entry,
+    record,
+)
+from changes.models import Change
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    record([recipe_entry(instance)])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    record([recipe_entry(instance, deleted=True)])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_saved(sender, instance, **kwargs):
+    record([recipe_ingredient_entry(
+        instance.recipe_id, instance.ingredient_id, instance.amount)])
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_deleted(sender, instance, **kwargs):
+    record([recipe_ingredient_entry(
+        instance.recipe_id, instance.ingredient_id)])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    if action == 'pre_clear':
+        # После очистки прежние связи уже не прочитать.
+        related = instance.recipes if reverse else instance.tags
+        pk_set = set(related.values_list('pk', flat=True))
+    elif action not in ('post_add', 'post_remove'):
+        return
+    pairs = ((pk, instance.pk) if reverse else (instance.pk, pk)
+             for pk in pk_set)
+    record(recipe_tag_entry(recipe_id, tag_id, action != 'post_add')
+           for recipe_id, tag_id in pairs)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, instance, signal, **kwargs):
+    record([(Change.TAG, instance.id, None if signal is post_delete else {
+        'name': instance.name,
+        'color': instance.color,
+        'slug': instance.slug,
+    }, None)])
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, instance, signal, **kwargs):
+    record([(
+        Change.INGREDIENT, instance.id,
+        None if signal is post_delete else {
+            'name': instance.name,
+            'measurement_unit': instance.measurement_unit,
+        }, None)])
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def favorite_changed(sender, instance, signal, **kwargs):
+    record([(
+        Change.FAVORITE, f'{instance.user_id}-{instance.recipe_id}',
+        None if signal is post_delete else {'recipe': instance.recipe_id},
+        instance.user_id)])
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, signal, **kwargs):
+    record([(
+        Change.SHOPPING_CART, f'{instance.user_id}-{instance.recipe_id}',
+        None if signal is post_delete else {
+            'recipe': instance.recipe_id,
+            'multiplier': instance.multiplier,
+        }, instance.user_id)])
+
+
+@receiver((post_save, post_delete), sender=Subscription)
+def subscription_changed(sender, instance, signal, **kwargs):
+    record([(
+        Change.SUBSCRIPTION, f'{instance.user_id}-{instance.author_id}',
+        None if signal is post_delete else {'author': instance.author_id},
+        instance.user_id)])
@@ -0,0 +1,10 @@
+from django.conf import settings
+
+from changes.log import compact
+from jobs.registry import register
+
+
+@register('changes.compact', every=settings.CHANGES_COMPACT_INTERVAL)
+def compact_task():
+    """Сжать журнал изменений."""
+    return {'deleted': compact()}
@@ -0,0 +1,17 @@
+"""Общие инструменты админки для больших таблиц."""
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from foodgram_backend.constants import ESTIMATED_COUNT_THRESHOLD
+from foodgram_backend.counting import estimate_count
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, не считающий точно строки больших таблиц."""
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+        return self.object_list.values('pk').order_by().count()
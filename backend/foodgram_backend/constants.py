@@ -3,6 +3,8 @@ EMAIL_LIMIT = 254
 USER_FIELD_LIMIT = 150
 RECIPE_FIELD_LIMIT = 200
 TAG_COLOR_LIMIT = 7
+JOB_NAME_LIMIT = 100
+CHANGE_KEY_LIMIT = 64
 
 
 # Ограничения валидации
@@ -10,6 +12,70 @@ MIN_COOKING_TIME = 1
 MAX_COOKING_TIME = 1440
 MIN_AMOUNT = 1
 MAX_AMOUNT = 30000
+MIN_MULTIPLIER = 1
+MAX_MULTIPLIER = 100
+
+# Фоновые задачи
+JOB_MAX_ATTEMPTS = 3
 
 FILE_NAME = "shopping-cart.txt"
 TITLE_SHOP_CART = "Список покупок с сайта Foodgram:\n\n"
+
+# Параметры запроса, при которых ответ анонимному пользователю кэшируется
+CACHED_QUERY_PARAMS = (
+    'page', 'limit', 'count', 'tags', 'tags_mode', 'author')
+
+# Нормализация единиц измерения: единица -> (базовая единица, множитель).
+# Единицы, которых нет в таблице, не пересчитываются.
+UNIT_CONVERSIONS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'стакан': ('мл', 250),
+    'ст. л.': ('мл', 15),
+    'ч. л.': ('мл', 5),
+}
+
+# Начиная с этого числа строк админка и API показывают оценку количества
+# записей из статистики Postgres вместо точного COUNT(*)
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+# Стоимость запроса оценивается числом читаемых строк БД: один токен
+# троттлинга соответствует ROWS_PER_TOKEN строкам. Запрос, который
+# прочитал бы больше REQUEST_ROWS_BUDGET строк, урезается или
+# выполняется в фоновой задаче.
+ROWS_PER_TOKEN = 100
+REQUEST_ROWS_BUDGET = 2000
+CART_ROWS_PER_RECIPE = 10
+MAX_PAGE_SIZE = 100
+
+# Сколько последних рецептов автора показывается в подписках;
+# остальные доступны по /api/users/{id}/recipes/
+MAX_RECIPES_PREVIEW = 10
+
+# Похожие рецепты: число соседей и вес тегов относительно ингредиентов
+SIMILAR_RECIPES_COUNT = 10
+SIMILARITY_TAG_WEIGHT = 0.5
+
+# Рекомендации по избранному и спискам покупок: длина списка пользователя,
+# длина общего рейтинга популярности, число соседей рецепта, вес
+# добавления в список покупок (избранное — 1) и сколько взаимодействий
+# самого активного пользователя учитывается при подсчёте совместных
+# встречаемостей
+RECOMMENDED_RECIPES_COUNT = 20
+POPULAR_RECIPES_COUNT = 100
+RECOMMENDATION_NEIGHBORS = 50
+RECOMMENDATION_CART_WEIGHT = 0.5
+RECOMMENDATION_USER_ITEMS_LIMIT = 500
+
+# Журнал изменений: записей в ответе /api/changes/ и строк, которые
+# сжатие журнала обрабатывает за одну транзакцию
+CHANGES_PAGE_SIZE = 500
+CHANGES_COMPACT_BATCH = 10000
+
+# Снимок каталога ингредиентов: сколько хранится в кэше (пересобирается
+# и раньше, при изменении каталога) и сколько кэшируется клиентом
+# по версионному URL
+CATALOGUE_SNAPSHOT_TIMEOUT = 24 * 60 * 60
+CATALOGUE_SNAPSHOT_MAX_AGE = 365 * 24 * 60 * 60
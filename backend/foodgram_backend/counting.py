@@ -0,0 +1,77 @@
+"""Подсчёт строк: подзапросы количества и оценки по статистике Postgres."""
+import json
+
+from django.db import connections
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def estimate_count(queryset):
+    """Оценка числа строк таблицы из pg_class или None.
+
+    Оценка возможна только для запроса без условий на Postgres
+    и только после того, как таблица была проанализирована.
+    """
+    if queryset.query.where or queryset.query.distinct:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+def planner_count(queryset):
+    """Оценка планировщика Postgres для произвольного запроса или None."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def approximate_count(queryset):
+    """Оценка числа строк запроса: из pg_class или от планировщика."""
+    estimate = estimate_count(queryset)
+    if estimate is None:
+        estimate = planner_count(queryset)
+    return estimate
+
+
+def aggregate_subquery(queryset, field, aggregate):
+    """Агрегат связанных объектов коррелированным подзапросом.
+
+    Если связанных объектов нет, результат 0, а не NULL.
+    """
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(value=aggregate)
+            .values('value'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def count_subquery(queryset, field):
+    """Количество связанных объектов коррелированным подзапросом.
+
+    В отличие от Count() с JOIN и GROUP BY, подзапрос выполняется
+    только для строк текущей страницы.
+    """
+    return aggregate_subquery(queryset, field, Count('pk'))
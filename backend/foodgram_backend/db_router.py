@@ -0,0 +1,33 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Разрешено ли читать с реплики в рамках текущего запроса.
+# Вне HTTP-запросов (management-команды, shell) все чтения идут в primary.
+use_replica = ContextVar('use_replica', default=False)
+
+
+def pin_to_primary():
+    """Направить все последующие чтения текущего запроса в primary."""
+    use_replica.set(False)
+
+
+class ReplicaRouter:
+    """Роутер БД: чтения на реплики, запись на primary."""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if replicas and use_replica.get():
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
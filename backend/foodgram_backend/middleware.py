@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import random
+import threading
+from collections import Counter
+from functools import partial
+from hmac import compare_digest
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram_backend.db_router import use_replica
+from foodgram_backend.profiling import (
+    StackSampler,
+    current_profile,
+    sample_thread,
+    write_stacks,
+)
+
+logger = logging.getLogger(__name__)
+
+# Поток синхронного кода текущего запроса под ASGI.
+in_request_thread = partial(sync_to_async, thread_sensitive=True)
+
+
+class SyncAndAsyncMiddleware:
+    """Основа middleware, которое работает под WSGI и под ASGI.
+
+    Под ASGI Django передаёт асинхронный get_response, и __call__
+    возвращает корутину __acall__: асинхронные представления
+    не оборачиваются в адаптер потоков.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Так Django распознаёт экземпляр как корутинную функцию.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.call(request)
+
+
+class ReadReplicaMiddleware(SyncAndAsyncMiddleware):
+    """Выбор базы данных для запроса.
+
+    Безопасные запросы (GET/HEAD/OPTIONS) читают с реплик.
+    После записи клиент получает cookie, и в течение
+    REPLICA_PIN_SECONDS его чтения идут в primary (read-your-writes).
+    """
+
+    @staticmethod
+    def allow_replica(request):
+        pinned = settings.REPLICA_PIN_COOKIE in request.COOKIES
+        return use_replica.set(request.method in SAFE_METHODS and not pinned)
+
+    @staticmethod
+    def pin(request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
+
+    def call(self, request):
+        token = self.allow_replica(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = self.allow_replica(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        return self.pin(request, response)
+
+
+class ProfilingMiddleware(SyncAndAsyncMiddleware):
+    """Сэмплирование стеков части запросов (foodgram_backend.profiling).
+
+    Запрос профилируется с вероятностью PROFILING_SAMPLE_RATE
+    или по заголовку X-Profile со значением PROFILING_TOKEN.
+    Если ни то, ни другое не задано, middleware исключается
+    из цепочки при запуске и запросы не замедляет.
+    """
+
+    def __init__(self, get_response):
+        if not (settings.PROFILING_SAMPLE_RATE or settings.PROFILING_TOKEN):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.sampler = StackSampler(settings.PROFILING_INTERVAL)
+
+    def should_profile(self, request):
+        token = request.headers.get('X-Profile')
+        if token and settings.PROFILING_TOKEN:
+            return compare_digest(
+                token.encode(), settings.PROFILING_TOKEN.encode())
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def write(self, request, stacks):
+        match = request.resolver_match
+        root = f'{request.method} {match.view_name if match else "-"}'
+        try:
+            write_stacks(settings.PROFILING_DIR, root, stacks)
+        except OSError:
+            logger.exception('Не удалось записать стеки профилирования')
+
+    def call(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        stacks = Counter()
+        token = current_profile.set((self.sampler, stacks))
+        try:
+            with sample_thread():
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        self.write(request, stacks)
+        return response
+
+    async def __acall__(self, request):
+        # Поток цикла событий не сэмплируется: в нём идут и другие
+        # запросы. Синхронный код профилируемого запроса (представления
+        # и middleware через адаптер Django) выполняется в отдельном
+        # потоке ThreadSensitiveContext, и этот поток сэмплируется
+        # целиком; асинхронные представления сэмплируют потоки своего
+        # пула (см. sample_thread и api.async_views).
+        if not self.should_profile(request):
+            return await self.get_response(request)
+        stacks = Counter()
+        token = current_profile.set((self.sampler, stacks))
+        try:
+            async with ThreadSensitiveContext():
+                thread_id = await in_request_thread(threading.get_ident)()
+                self.sampler.start(thread_id, stacks)
+                try:
+                    response = await self.get_response(request)
+                finally:
+                    self.sampler.stop(thread_id)
+                    # Поток завершится вместе с контекстом: его соединения
+                    # с БД закрываются сразу.
+                    await in_request_thread(connections.close_all)()
+        finally:
+            current_profile.reset(token)
+        self.write(request, stacks)
+        return response
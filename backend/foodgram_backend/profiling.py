@@ -0,0 +1,159 @@
+"""Выборочное профилирование запросов для flame graph.
+
+Профилировщик сэмплирующий: фоновый поток раз в PROFILING_INTERVAL
+секунд снимает стеки потоков, которые сейчас обрабатывают
+профилируемые запросы. Код запроса не трассируется, поэтому
+замедление не зависит от числа вызовов функций, а поток сэмплера
+спит, пока профилируемых запросов нет.
+
+Стеки пишутся в формате collapsed (как у stackcollapse из FlameGraph):
+строка «корень;кадр;...;кадр число_сэмплов», корень — метод и имя
+представления. Каждый процесс дописывает свой файл за текущий час
+в PROFILING_DIR; файлы объединяет команда profile_report.
+
+Сэмплируются потоки, в которых выполняется код запроса: поток
+ProfilingMiddleware под WSGI, а под ASGI — поток синхронного кода
+запроса и потоки пула асинхронных представлений (sample_thread);
+сэмплы всех потоков запроса суммируются.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import thread
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+STACKS_SUFFIX = '.folded'
+# Поток пула, который ждёт работу: такие сэмплы не пишутся.
+IDLE_CODE = thread._worker.__code__
+
+# Сэмплер и счётчик стеков профилируемого запроса (иначе None).
+current_profile = ContextVar('current_profile', default=None)
+PATH_PREFIXES = sorted(
+    {os.path.join(path, '') for path in sys.path if path},
+    key=len, reverse=True)
+
+
+def short_path(filename):
+    """Путь к модулю относительно sys.path."""
+    for prefix in PATH_PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+def frame_label(code):
+    return (f'{code.co_name} '
+            f'({short_path(code.co_filename)}:{code.co_firstlineno})')
+
+
+class StackSampler:
+    """Сэмплер стеков выбранных потоков."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.active = {}
+        self.labels = {}
+        self.thread = None
+
+    def start(self, thread_id, stacks):
+        """Начать сбор стеков потока в Counter стек -> число сэмплов."""
+        with self.lock:
+            self.active[thread_id] = stacks
+            # После fork поток сэмплера остаётся только в родителе.
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='stack-sampler', daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+
+    def stop(self, thread_id):
+        with self.lock:
+            self.active.pop(thread_id, None)
+
+    def collapse(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            label = self.labels.get(code)
+            if label is None:
+                label = self.labels[code] = frame_label(code)
+            stack.append(label)
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            with self.lock:
+                if not self.active:
+                    self.wakeup.clear()
+                    continue
+                thread_ids = list(self.active)
+            frames = sys._current_frames()
+            stacks = [(thread_id, self.collapse(frames[thread_id]))
+                      for thread_id in thread_ids if thread_id in frames
+                      and frames[thread_id].f_code is not IDLE_CODE]
+            del frames
+            with self.lock:
+                for thread_id, stack in stacks:
+                    if thread_id in self.active:
+                        self.active[thread_id][stack] += 1
+            time.sleep(self.interval)
+
+
+@contextmanager
+def sample_thread():
+    """Сэмплировать текущий поток, если запрос профилируется."""
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    sampler, stacks = profile
+    thread_id = threading.get_ident()
+    sampler.start(thread_id, stacks)
+    try:
+        yield
+    finally:
+        sampler.stop(thread_id)
+
+
+def stacks_path(directory):
+    """Файл стеков текущего процесса за текущий час."""
+    return os.path.join(
+        directory,
+        f'{time.strftime("%Y%m%d%H")}-{os.getpid()}{STACKS_SUFFIX}')
+
+
+def write_stacks(directory, root, stacks):
+    """Дописать стеки запроса одной записью в файл процесса.
+
+    Одна запись с O_APPEND не перемешивается с записями других потоков.
+    """
+    if not stacks:
+        return
+    data = ''.join(f'{root};{stack} {count}\n'
+                   for stack, count in stacks.items()).encode()
+    os.makedirs(directory, exist_ok=True)
+    fd = os.open(stacks_path(directory),
+                 os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def read_stacks(paths):
+    """Суммарные сэмплы стеков из файлов: Counter стек -> число."""
+    stacks = Counter()
+    for path in paths:
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack and count.isdigit():
+                    stacks[stack] += int(count)
+    return stacks
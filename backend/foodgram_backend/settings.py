@@ -29,10 +29,14 @@ INSTALLED_APPS = [
     'api',
     'recipes',
     'users',
+    'jobs',
+    'changes',
 ]
 
 MIDDLEWARE = [
+    'foodgram_backend.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'foodgram_backend.middleware.ReadReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -81,6 +85,76 @@ else:
         }
     }
 
+# Реплики только для чтения: список хостов PostgreSQL через запятую.
+# Для локальной проверки SQLITE_REPLICA=True добавляет второй файл SQLite.
+for number, host in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(','))):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+if os.getenv('SQLITE_REPLICA', default=False):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Покрывающие индексы (INCLUDE) создаются только в PostgreSQL.
+SILENCED_SYSTEM_CHECKS = ['models.W040']
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['foodgram_backend.db_router.ReplicaRouter']
+
+# Время (сек.), в течение которого после записи чтения идут в primary.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', default=5))
+REPLICA_PIN_COOKIE = 'pin_primary'
+
+# Асинхронные представления для чтения (включаются при запуске через ASGI).
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', default='') == 'True'
+
+CACHES = {
+    'default': {
+        'BACKEND': (os.getenv('CACHE_BACKEND')
+                    or 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION') or 'foodgram',
+    }
+}
+
+# Кэш ответов API (api.cache). Нужен общий для процессов кэш:
+# по умолчанию включён, только если CACHE_BACKEND задан и это не кэш
+# в памяти процесса. RESPONSE_CACHE=True включает его и с LocMemCache —
+# только для одного процесса (runserver, тесты).
+RESPONSE_CACHE = os.getenv('RESPONSE_CACHE', default=str(
+    not CACHES['default']['BACKEND'].endswith('LocMemCache'))) == 'True'
+# Время жизни (сек.) кэшированных ответов API.
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=300))
+# Время жизни (сек.) кэшированного количества объектов в пагинации.
+COUNT_CACHE_TIMEOUT = int(os.getenv('COUNT_CACHE_TIMEOUT', default=60))
+
+# Фоновые задачи (сек.): опрос очереди, пауза перед повтором,
+# время, после которого задача упавшего воркера возвращается в очередь.
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', default=1))
+JOB_RETRY_DELAY = int(os.getenv('JOB_RETRY_DELAY', default=10))
+JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', default=600))
+# Период (сек.) сжатия журнала изменений воркерами run_jobs.
+CHANGES_COMPACT_INTERVAL = int(
+    os.getenv('CHANGES_COMPACT_INTERVAL', default=3600))
+
+# Потоки для параллельных запросов внутри запроса под ASGI
+# (api.concurrency) на процесс.
+CONCURRENT_LOOKUP_THREADS = int(
+    os.getenv('CONCURRENT_LOOKUP_THREADS', default=16))
+
+# Выборочное профилирование запросов: доля профилируемых запросов,
+# токен для заголовка X-Profile (пустой — заголовок не принимается),
+# интервал сэмплирования стеков (сек.) и каталог для файлов стеков.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', default=0))
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', default='')
+PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL', default=0.005))
+PROFILING_DIR = os.getenv('PROFILING_DIR') or BASE_DIR / 'profiles'
+
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -90,7 +164,17 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'api.paginations.LimitPageNumberPagination',
+    'DEFAULT_THROTTLE_CLASSES': ['api.throttles.TokenBucketThrottle'],
+    'DEFAULT_THROTTLE_RATES': {
+        'shopping_cart': os.getenv('THROTTLE_SHOPPING_CART', '30/min'),
+        'subscriptions': os.getenv('THROTTLE_SUBSCRIPTIONS', '60/min'),
+        'autocomplete': os.getenv('THROTTLE_AUTOCOMPLETE', '120/min'),
+    },
     'PAGE_SIZE': 6,
 }
 
@@ -141,6 +225,10 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # MEDIA_ROOT = '/media'
 # MEDIA_ROOT = BASE_DIR / 'media'
+# Время (сек.) после загрузки картинки, в течение которого её файл
+# не удаляется как неиспользуемый: ссылка на него может быть ещё
+# в незавершённой транзакции.
+IMAGE_GRACE_PERIOD = int(os.getenv('IMAGE_GRACE_PERIOD', default=3600))
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
@@ -0,0 +1,11 @@
+# Конфигурация gunicorn для асинхронного режима (ASGI, воркеры uvicorn):
+#   gunicorn -c gunicorn_asgi.py foodgram_backend.asgi
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+timeout = 30
+keepalive = 5
@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from jobs.models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'user', 'created',
+                    'finished')
+    list_filter = ('status', 'name')
+    readonly_fields = ('created', 'finished', 'locked_at')
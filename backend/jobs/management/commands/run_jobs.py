@@ -0,0 +1,67 @@
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+from jobs.worker import enqueue_periodic, run_next_job
+
+
+def work(stop, once):
+    """Цикл одного процесса-воркера."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    connections.close_all()
+    while not stop.is_set():
+        try:
+            if run_next_job():
+                continue
+        except DatabaseError:
+            # Например, блокировка SQLite: повторить после паузы.
+            connections.close_all()
+        else:
+            if once:
+                break
+        stop.wait(settings.JOB_POLL_INTERVAL)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'запуск воркеров фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=multiprocessing.cpu_count())
+        parser.add_argument(
+            '--once', action='store_true',
+            help='выполнить задачи из очереди и завершиться')
+
+    def handle(self, *args, **options):
+        # Периодические задачи, срок которых наступил, выполнит и --once.
+        due = {}
+        enqueue_periodic(due)
+        # Соединения родителя не должны наследоваться дочерними процессами.
+        connections.close_all()
+        stop = multiprocessing.Event()
+        processes = [
+            multiprocessing.Process(target=work, args=(stop, options['once']))
+            for _ in range(options['processes'])]
+        for process in processes:
+            process.start()
+
+        def shutdown(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        self.stdout.write(self.style.SUCCESS(
+            f'***** Запущено воркеров: {len(processes)}'))
+        while any(process.is_alive() for process in processes):
+            if not (options['once'] or stop.is_set()):
+                try:
+                    enqueue_periodic(due)
+                except DatabaseError:
+                    connections.close_all()
+            time.sleep(1)
+        self.stdout.write(self.style.SUCCESS('***** Воркеры остановлены'))
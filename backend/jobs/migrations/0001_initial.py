@@ -0,0 +1,45 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='задача')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='параметры')),
+                ('status', models.CharField(choices=[('pending', 'в очереди'), ('running', 'выполняется'), ('done', 'выполнена'), ('failed', 'ошибка')], default='pending', max_length=7, verbose_name='статус')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='результат')),
+                ('error', models.TextField(blank=True, verbose_name='ошибка')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='попыток')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='максимум попыток')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='не раньше')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='взята в работу')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='создана')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='завершена')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'задача',
+                'verbose_name_plural': 'задачи',
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'run_after'], name='job_status_run_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2026-10-19 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['name', '-created'], name='job_name_created_idx'),
+        ),
+    ]
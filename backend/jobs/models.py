@@ -0,0 +1,93 @@
+from django.db import models
+from django.utils import timezone
+
+from foodgram_backend.constants import JOB_MAX_ATTEMPTS, JOB_NAME_LIMIT
+from users.models import User
+
+
+class Job(models.Model):
+    """Модель фоновой задачи."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'в очереди'),
+        (RUNNING, 'выполняется'),
+        (DONE, 'выполнена'),
+        (FAILED, 'ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=JOB_NAME_LIMIT,
+        verbose_name='задача',
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='параметры',
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name='пользователь'
+    )
+    status = models.CharField(
+        max_length=max(len(status) for status, _ in STATUSES),
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='статус',
+    )
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='результат',
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='ошибка',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='попыток',
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=JOB_MAX_ATTEMPTS,
+        verbose_name='максимум попыток',
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='не раньше',
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='взята в работу',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='создана',
+    )
+    finished = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='завершена',
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'задача'
+        verbose_name_plural = 'задачи'
+        indexes = [
+            models.Index(
+                fields=('status', 'run_after'), name='job_status_run_idx'),
+            models.Index(
+                fields=('name', '-created'), name='job_name_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.id} ({self.status})'
@@ -0,0 +1,71 @@
+"""Регистрация и постановка фоновых задач в очередь.
+
+Задача — функция, принимающая параметры задачи именованными
+аргументами и возвращающая JSON-совместимый результат:
+
+    @register('recipes.recompute_rollups')
+    def recompute(recipe_ids=None):
+        ...
+
+    enqueue('recipes.recompute_rollups', recipe_ids=[1, 2])
+
+Задача с every=<секунды> без параметров ставится в очередь
+периодически командой run_jobs (jobs.worker.enqueue_periodic).
+"""
+import json
+from hashlib import md5
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from jobs.models import Job
+
+TASKS = {}
+# Периодические задачи: имя -> период (сек.).
+PERIODIC = {}
+
+
+def register(name, every=None):
+    def decorator(func):
+        TASKS[name] = func
+        if every:
+            PERIODIC[name] = every
+        return func
+    return decorator
+
+
+def lock_unique(name, user, payload):
+    """Блокировка постановки одинаковых задач до конца транзакции.
+
+    На Postgres — транзакционная advisory-блокировка по хешу задачи:
+    проверка и вставка одинаковых задач идут по очереди. SQLite
+    и без неё выполняет пишущие транзакции по одной.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    key = json.dumps(
+        [name, user and user.pk, payload], sort_keys=True,
+        cls=DjangoJSONEncoder)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [int.from_bytes(
+            md5(key.encode()).digest()[:8], 'big', signed=True)])
+
+
+def enqueue(name, user=None, unique=False, **payload):
+    """Поставить задачу в очередь.
+
+    С unique=True задача не дублируется, если такая же (имя,
+    пользователь, параметры) уже ждёт выполнения, в том числе
+    при одновременных вызовах.
+    """
+    if name not in TASKS:
+        raise KeyError(f'Неизвестная задача: {name}')
+    if not unique:
+        return Job.objects.create(name=name, user=user, payload=payload)
+    with transaction.atomic():
+        lock_unique(name, user, payload)
+        job = Job.objects.filter(
+            name=name, user=user, payload=payload, status=Job.PENDING).first()
+        if job is not None:
+            return job
+        return Job.objects.create(name=name, user=user, payload=payload)
@@ -0,0 +1,105 @@
+"""Выполнение задач из очереди в БД.
+
+Задача забирается запросом SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+несколько процессов (и серверов) выполняют очередь без брокера
+и без повторной выдачи одной задачи. Задачи, взятые в работу
+упавшим воркером, возвращаются в очередь по истечении JOB_TIMEOUT;
+каждый такой возврат считается попыткой, и после max_attempts задача
+получает статус FAILED. Периодические задачи ставит в очередь
+родительский процесс run_jobs (enqueue_periodic).
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.registry import PERIODIC, TASKS, enqueue
+
+
+def claim_job():
+    """Взять следующую задачу или вернуть None."""
+    now = timezone.now()
+    stale = Q(status=Job.RUNNING,
+              locked_at__lt=now - timedelta(seconds=settings.JOB_TIMEOUT))
+    while True:
+        with transaction.atomic():
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(Q(status=Job.PENDING, run_after__lte=now) | stale)
+                .order_by('run_after', 'id')
+                .first()
+            )
+            if job is None:
+                return None
+            if job.status == Job.RUNNING and (
+                    job.attempts >= job.max_attempts):
+                # Воркер падал на задаче все max_attempts раз.
+                job.status = Job.FAILED
+                job.error = (f'Задача не завершилась за {job.attempts} '
+                             f'попыток по {settings.JOB_TIMEOUT} с.')
+                job.locked_at = None
+                job.finished = now
+                job.save(update_fields=(
+                    'status', 'error', 'locked_at', 'finished'))
+                continue
+            job.status = Job.RUNNING
+            job.attempts += 1
+            job.locked_at = now
+            job.save(update_fields=('status', 'attempts', 'locked_at'))
+        return job
+
+
+def run_job(job):
+    """Выполнить задачу; при ошибке повторить позже с нарастающей паузой."""
+    try:
+        result = TASKS[job.name](**job.payload)
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1))
+        else:
+            job.status = Job.FAILED
+            job.finished = timezone.now()
+    else:
+        job.status = Job.DONE
+        job.result = result
+        job.error = ''
+        job.finished = timezone.now()
+    job.locked_at = None
+    job.save(update_fields=(
+        'status', 'result', 'error', 'run_after', 'locked_at', 'finished'))
+    return job
+
+
+def run_next_job():
+    """Выполнить одну задачу; False, если очередь пуста."""
+    job = claim_job()
+    if job is None:
+        return False
+    run_job(job)
+    return True
+
+
+def enqueue_periodic(due):
+    """Поставить в очередь периодические задачи, чей период истёк.
+
+    due — словарь имя -> время следующей проверки в памяти процесса.
+    Задача ставится, только если такая не ставилась в течение периода,
+    поэтому run_jobs на нескольких серверах её не дублируют.
+    """
+    now = timezone.now()
+    for name, every in PERIODIC.items():
+        if due.get(name, now) > now:
+            continue
+        last = Job.objects.filter(name=name).order_by(
+            '-created').values_list('created', flat=True).first()
+        if last is None or last <= now - timedelta(seconds=every):
+            enqueue(name, unique=True)
+            last = now
+        due[name] = last + timedelta(seconds=every)
@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.db.models import Prefetch
 from django.utils.safestring import mark_safe
 
+from foodgram_backend.admin_utils import EstimatedCountPaginator
+from foodgram_backend.counting import count_subquery
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -9,21 +12,41 @@ from recipes.models import (
     ShoppingCart,
     Tag,
 )
+from recipes.signals import replace_image
 
 
 class RecipeIngredientInline(admin.StackedInline):
     model = RecipeIngredient
     extra = 1
     min_num = 1
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'name', 'author', 'get_ingredients', 'get_favorite_count', 'get_image')
-    list_filter = ('author', 'name', 'tags')
+    list_filter = ('tags',)
+    list_select_related = ('author',)
+    search_fields = ('name', 'author__username')
+    autocomplete_fields = ('author',)
     readonly_fields = ('get_ingredients', 'get_favorite_count', )
     inlines = [RecipeIngredientInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'),
+            ),
+        ).annotate(
+            favorite_count=count_subquery(Favorite.objects, 'recipe'))
 
     @admin.display(description='Ингредиенты')
     def get_ingredients(self, obj):
@@ -31,12 +54,18 @@ class RecipeAdmin(admin.ModelAdmin):
 
     @admin.display(description='В избранном')
     def get_favorite_count(self, obj):
-        return obj.favorites.count()
+        return obj.favorite_count
 
     @admin.display(description='Картинка')
     def get_image(self, obj):
         return mark_safe(f'<img src={obj.image.url} width="80" height="60">')
 
+    def save_model(self, request, obj, form, change):
+        previous = form.initial.get('image')
+        super().save_model(request, obj, form, change)
+        if change:
+            replace_image(previous and previous.name, obj)
+
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -46,14 +75,25 @@ class TagAdmin(admin.ModelAdmin):
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit')
-    list_filter = ('name', )
+    list_filter = ('measurement_unit', )
+    search_fields = ('name', )
 
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -6,3 +6,6 @@ class RecipesConfig(AppConfig):
     name = 'recipes'
     verbose_name = 'Управление рецептами'
     verbose_name_plural = 'Управление рецептами'
+
+    def ready(self):
+        import recipes.signals  # noqa: F401
@@ -0,0 +1,80 @@
+import os
+import re
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.signals import replace_image
+
+BATCH_SIZE = 1000
+HASHED_NAME = re.compile(r'^images/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+
+class Command(BaseCommand):
+    help = ('удаление картинок, на которые не ссылается ни один рецепт '
+            '(кроме загруженных меньше IMAGE_GRACE_PERIOD назад)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rehash', action='store_true',
+            help='перенести старые картинки на имена по содержимому')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='только показать файлы, которые будут удалены')
+
+    def handle(self, *args, **options):
+        self.storage = Recipe._meta.get_field('image').storage
+        if options['rehash'] and not options['dry_run']:
+            self.rehash()
+        removed = 0
+        for batch in self.batches(self.walk('images')):
+            used = set(Recipe.objects.filter(
+                image__in=batch).values_list('image', flat=True))
+            for name in batch:
+                if name in used or self.storage.is_recent(name):
+                    continue
+                removed += 1
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    self.storage.delete(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'***** Удалено неиспользуемых файлов: {removed}'))
+
+    def rehash(self):
+        recipes = Recipe.objects.exclude(
+            image__regex=HASHED_NAME.pattern).only('id', 'image')
+        moved = 0
+        for recipe in recipes.iterator():
+            name = recipe.image.name
+            if not self.storage.exists(name):
+                self.stderr.write(f'Файл не найден: {name}')
+                continue
+            with self.storage.open(name) as content:
+                recipe.image.name = self.storage.save(name, content)
+            # save(), а не update(): сигналы сбрасывают кэш ответов API.
+            recipe.save(update_fields=('image',))
+            replace_image(name, recipe)
+            moved += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'***** Переименовано картинок: {moved}'))
+
+    def walk(self, path):
+        if not self.storage.exists(path):
+            return
+        directories, files = self.storage.listdir(path)
+        for name in files:
+            yield os.path.join(path, name)
+        for directory in directories:
+            yield from self.walk(os.path.join(path, directory))
+
+    @staticmethod
+    def batches(names):
+        batch = []
+        for name in names:
+            batch.append(name)
+            if len(batch) == BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
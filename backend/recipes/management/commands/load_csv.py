@@ -3,6 +3,7 @@ import csv
 from django.core.management.base import BaseCommand
 
 from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.rollups import recompute_rollups
 
 FILE_TABLES = {
     'ingredients': Ingredient,
@@ -26,7 +27,11 @@ class Command(BaseCommand):
         else:
             with open(f'./data/{filename}.csv', encoding='utf-8') as csv_file:
                 csv_reader = csv.DictReader(csv_file, delimiter=',')
-                FILE_TABLES[filename].objects.bulk_create(
+                objects = FILE_TABLES[filename].objects.bulk_create(
                     FILE_TABLES[filename](**data) for data in csv_reader)
-                self.stdout.write(self.style.SUCCESS(
-                    f'***** Imported: {csv_reader.line_num-1} lines'))
+            # bulk_create не вызывает сигналы, пересчитывающие итоги.
+            if FILE_TABLES[filename] is RecipeIngredient:
+                recompute_rollups(
+                    sorted({int(obj.recipe_id) for obj in objects}))
+            self.stdout.write(self.style.SUCCESS(
+                f'***** Imported: {csv_reader.line_num-1} lines'))
@@ -0,0 +1,21 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+
+from recipes.recommendations import recompute_recommendations
+
+
+class Command(BaseCommand):
+    help = 'пересчёт рекомендаций пользователей и рейтинга популярности'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--processes', type=int, default=multiprocessing.cpu_count())
+
+    def handle(self, *args, **options):
+        count = recompute_recommendations(
+            chunk_size=options['chunk_size'],
+            processes=options['processes'])
+        self.stdout.write(self.style.SUCCESS(
+            f'***** Пересчитано пользователей: {count}'))
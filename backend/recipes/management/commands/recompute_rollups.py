@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes.rollups import recompute_rollups
+
+
+class Command(BaseCommand):
+    help = 'пересчёт нормализованных итогов ингредиентов всех рецептов'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(
+            f'***** Пересчитано рецептов: {recompute_rollups()}'))
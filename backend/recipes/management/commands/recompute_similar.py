@@ -0,0 +1,21 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import recompute_similar
+
+
+class Command(BaseCommand):
+    help = 'пересчёт похожих рецептов (ближайших соседей) всех рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--processes', type=int, default=multiprocessing.cpu_count())
+
+    def handle(self, *args, **options):
+        count = recompute_similar(
+            chunk_size=options['chunk_size'],
+            processes=options['processes'])
+        self.stdout.write(self.style.SUCCESS(
+            f'***** Пересчитано рецептов: {count}'))
@@ -0,0 +1,102 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from recipes.rollups import recompute_rollups
+from users.models import Subscription, User
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = ('Заполнение БД большим объёмом тестовых данных '
+            '(ингредиенты и теги должны быть загружены)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--favorites', type=int, default=100000)
+        parser.add_argument('--carts', type=int, default=20000)
+        parser.add_argument('--subscriptions', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def create(self, model, objects):
+        model.objects.bulk_create(
+            objects, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+    def pairs(self, count, left, right):
+        """Случайные уникальные пары id."""
+        result = set()
+        limit = min(count, len(left) * len(right))
+        while len(result) < limit:
+            result.add((random.choice(left), random.choice(right)))
+        return result
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        if not ingredient_ids or not tag_ids:
+            self.stdout.write(self.style.ERROR(
+                '***** Сначала выполните load_ingredients'))
+            return
+        first_user = User.objects.order_by('-id').values_list(
+            'id', flat=True).first() or 0
+        self.create(User, (
+            User(
+                email=f'seed{number}@foodgram.local',
+                username=f'seed{number}',
+                first_name='Имя',
+                last_name='Фамилия',
+            ) for number in range(
+                first_user + 1, first_user + 1 + options['users'])))
+        user_ids = list(User.objects.values_list('id', flat=True))
+        self.create(Recipe, (
+            Recipe(
+                author_id=random.choice(user_ids),
+                name=f'Рецепт {number}',
+                image='images/default.jpg',
+                text='Описание рецепта',
+                cooking_time=random.randint(5, 180),
+            ) for number in range(options['recipes'])))
+        recipe_ids = list(
+            Recipe.objects.order_by('id').values_list('id', flat=True))
+        new_recipe_ids = recipe_ids[len(recipe_ids) - options['recipes']:]
+        self.create(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in new_recipe_ids
+            for tag_id in random.sample(
+                tag_ids, random.randint(1, min(3, len(tag_ids))))))
+        self.create(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=random.randint(1, 500))
+            for recipe_id in new_recipe_ids
+            for ingredient_id in random.sample(
+                ingredient_ids, random.randint(3, 10))))
+        recompute_rollups(new_recipe_ids)
+        for model, count in ((Favorite, options['favorites']),
+                             (ShoppingCart, options['carts'])):
+            self.create(model, (
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id, recipe_id in self.pairs(
+                    count, user_ids, recipe_ids)))
+        self.create(Subscription, (
+            Subscription(user_id=user_id, author_id=author_id)
+            for user_id, author_id in self.pairs(
+                options['subscriptions'], user_ids, user_ids)
+            if user_id != author_id))
+        self.stdout.write(self.style.SUCCESS(
+            f'***** Создано: {options["users"]} пользователей, '
+            f'{options["recipes"]} рецептов'))
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from recipes.rollups import recompute_rollups
+
+
+def backfill_rollups(apps, schema_editor):
+    recompute_rollups(
+        None,
+        apps.get_model('recipes', 'RecipeIngredient'),
+        apps.get_model('recipes', 'RecipeRollup'),
+        apps.get_model('recipes', 'Recipe'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='название ингредиента')),
+                ('measurement_unit', models.CharField(max_length=200, verbose_name='базовая единица измерения')),
+                ('amount', models.PositiveIntegerField(verbose_name='количество в базовых единицах')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='recipes.recipe', verbose_name='рецепт')),
+            ],
+            options={
+                'verbose_name': 'итог по ингредиенту',
+                'verbose_name_plural': 'итоги по ингредиентам',
+                'ordering': ('recipe', 'name'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reciperollup',
+            constraint=models.UniqueConstraint(fields=('recipe', 'name', 'measurement_unit'), name='unique_recipe_rollup'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
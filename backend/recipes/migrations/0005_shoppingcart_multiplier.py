@@ -0,0 +1,19 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:27
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='multiplier',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Во сколько раз увеличить количество ингредиентов', validators=[django.core.validators.MinValueValidator(1, message='Множитель должен быть не менее 1'), django.core.validators.MaxValueValidator(100, message='Множитель должен быть не более 100')], verbose_name='множитель порций'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:33
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_shoppingcart_multiplier'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, help_text='Выберите файл с картинкой', storage=recipes.storage.HashedImageStorage(), upload_to='images/', verbose_name='картинка'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0008_recipe_neighbors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='оценка')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe', verbose_name='рецепт')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'рекомендация',
+                'verbose_name_plural': 'рекомендации',
+                'ordering': ('user', '-score'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reciperecommendation',
+            index=models.Index(fields=['user', '-score'], name='recommendation_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='reciperecommendation',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_user_recommendation'),
+        ),
+    ]
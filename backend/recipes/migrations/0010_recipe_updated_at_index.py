@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-19 10:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_recommendations'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='дата изменения'),
+        ),
+    ]
@@ -8,11 +8,14 @@ from django.db import models
 from foodgram_backend.constants import (
     MAX_AMOUNT,
     MAX_COOKING_TIME,
+    MAX_MULTIPLIER,
     MIN_AMOUNT,
     MIN_COOKING_TIME,
+    MIN_MULTIPLIER,
     RECIPE_FIELD_LIMIT,
     TAG_COLOR_LIMIT,
 )
+from recipes.storage import image_storage
 from users.models import User
 
 
@@ -88,6 +91,11 @@ class Recipe(models.Model):
         db_index=True,
         verbose_name='дата добавления',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='дата изменения',
+    )
     name = models.CharField(
         max_length=RECIPE_FIELD_LIMIT,
         verbose_name='название',
@@ -96,6 +104,8 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         upload_to='images/',
+        storage=image_storage,
+        db_index=True,
         verbose_name='картинка',
         help_text='Выберите файл с картинкой',
     )
@@ -134,6 +144,10 @@ class Recipe(models.Model):
         ordering = ('-pub_date', )
         verbose_name = 'рецепт'
         verbose_name_plural = 'рецепты'
+        indexes = [
+            models.Index(
+                fields=('author', '-pub_date'), name='recipe_author_date_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -176,12 +190,132 @@ class RecipeIngredient(models.Model):
                 fields=('recipe', 'ingredient'),
                 name='unique_recipe_ingredient')
         ]
+        indexes = [
+            # Список покупок читает amount без обращения к таблице.
+            models.Index(
+                fields=('recipe', 'ingredient'), include=('amount',),
+                name='recipe_ingredient_amount_idx'),
+        ]
 
     def __str__(self):
         return (f'{self.ingredient.name} {self.amount} '
                 f'{self.ingredient.measurement_unit}')
 
 
+class RecipeRollup(models.Model):
+    """Модель итогов по ингредиентам рецепта в нормализованных единицах."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='rollups',
+        verbose_name='рецепт'
+    )
+    name = models.CharField(
+        max_length=RECIPE_FIELD_LIMIT,
+        verbose_name='название ингредиента',
+    )
+    measurement_unit = models.CharField(
+        max_length=RECIPE_FIELD_LIMIT,
+        verbose_name='базовая единица измерения',
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='количество в базовых единицах',
+    )
+
+    class Meta:
+        ordering = ('recipe', 'name')
+        verbose_name = 'итог по ингредиенту'
+        verbose_name_plural = 'итоги по ингредиентам'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'name', 'measurement_unit'),
+                name='unique_recipe_rollup')
+        ]
+
+    def __str__(self):
+        return f'{self.name} {self.amount} {self.measurement_unit}'
+
+
+class RecipeNeighbor(models.Model):
+    """Модель похожего рецепта (предрасчитанные ближайшие соседи)."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbors',
+        verbose_name='рецепт'
+    )
+    neighbor = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='косинусная близость',
+    )
+
+    class Meta:
+        ordering = ('recipe', '-score')
+        verbose_name = 'похожий рецепт'
+        verbose_name_plural = 'похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'neighbor'),
+                name='unique_recipe_neighbor')
+        ]
+        indexes = [
+            models.Index(
+                fields=('recipe', '-score'), name='recipe_neighbor_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} ~ {self.neighbor_id} ({self.score:.3f})'
+
+
+class RecipeRecommendation(models.Model):
+    """Модель рекомендованного пользователю рецепта.
+
+    Записи без пользователя — общий рейтинг популярности.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='recommendations',
+        verbose_name='пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='оценка',
+    )
+
+    class Meta:
+        ordering = ('user', '-score')
+        verbose_name = 'рекомендация'
+        verbose_name_plural = 'рекомендации'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'), name='unique_user_recommendation')
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-score'),
+                name='recommendation_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.recipe_id} ({self.score:.3f})'
+
+
 class UserRecipeAbstractModel(models.Model):
     user = models.ForeignKey(
         User,
@@ -201,6 +335,11 @@ class UserRecipeAbstractModel(models.Model):
         constraints = [
             models.UniqueConstraint(
                 fields=('user', 'recipe'), name='unique_user_%(class)s')]
+        # Индекс (user, recipe) создаёт ограничение уникальности.
+        indexes = [
+            models.Index(
+                fields=('recipe', 'user'), name='%(class)s_recipe_user_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user.username} -> {self.recipe.name}'
@@ -217,6 +356,20 @@ class Favorite(UserRecipeAbstractModel):
 class ShoppingCart(UserRecipeAbstractModel):
     """Модель списка покупок."""
 
+    multiplier = models.PositiveSmallIntegerField(
+        default=MIN_MULTIPLIER,
+        verbose_name='множитель порций',
+        validators=[
+            MinValueValidator(
+                MIN_MULTIPLIER,
+                message=f'Множитель должен быть не менее {MIN_MULTIPLIER}'),
+            MaxValueValidator(
+                MAX_MULTIPLIER,
+                message=f'Множитель должен быть не более {MAX_MULTIPLIER}')
+        ],
+        help_text='Во сколько раз увеличить количество ингредиентов'
+    )
+
     class Meta(UserRecipeAbstractModel.Meta):
         verbose_name = 'список покупок'
         verbose_name_plural = 'списки покупок'
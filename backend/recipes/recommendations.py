@@ -0,0 +1,169 @@
+"""Рекомендации рецептов по избранному и спискам покупок (item-item).
+
+Взаимодействия пользователей образуют разреженную матрицу
+пользователь x рецепт. Близость рецептов — косинус их столбцов
+с весами IDF по пользователям (активные пользователи весят меньше);
+для каждого рецепта хранится RECOMMENDATION_NEIGHBORS лучших соседей.
+Оценка рецепта для пользователя — сумма близостей к его рецептам.
+Обе фазы идут блоками, поэтому память ограничена размером блока,
+а не квадратом числа рецептов или пользователей.
+"""
+from itertools import chain
+
+import numpy as np
+from django.db import transaction
+
+from foodgram_backend.constants import (
+    POPULAR_RECIPES_COUNT,
+    RECOMMENDATION_CART_WEIGHT,
+    RECOMMENDATION_NEIGHBORS,
+    RECOMMENDATION_USER_ITEMS_LIMIT,
+    RECOMMENDED_RECIPES_COUNT,
+)
+from recipes.models import Favorite, RecipeRecommendation, ShoppingCart
+from recipes.similarity import RecipeVectors, map_blocks
+
+INTERACTIONS = (
+    (Favorite, 1.0),
+    (ShoppingCart, RECOMMENDATION_CART_WEIGHT),
+)
+READ_CHUNK_SIZE = 100000
+
+
+def group_starts(sorted_keys):
+    """Начала групп равных значений в отсортированном массиве."""
+    return np.flatnonzero(np.diff(sorted_keys, prepend=-1))
+
+
+def load_interactions():
+    """Массивы (user_id, recipe_id, weight) без повторов пар.
+
+    Вес пары — сумма весов её взаимодействий.
+    """
+    pairs, weights = [], []
+    for model, weight in INTERACTIONS:
+        rows = np.fromiter(
+            chain.from_iterable(model.objects.values_list(
+                'user_id', 'recipe_id').order_by().iterator(
+                    chunk_size=READ_CHUNK_SIZE)),
+            dtype=np.int64).reshape(-1, 2)
+        pairs.append(rows)
+        weights.append(np.full(len(rows), weight))
+    pairs = np.concatenate(pairs)
+    # Пара кодируется одним числом: np.unique по строкам намного медленнее.
+    base = pairs[:, 1].max(initial=0) + 1
+    keys, inverse = np.unique(
+        pairs[:, 0] * base + pairs[:, 1], return_inverse=True)
+    return (keys // base, keys % base,
+            np.bincount(inverse, np.concatenate(weights)))
+
+
+def limit_per_user(users, recipes, weights, limit):
+    """Не больше limit самых весомых (затем новых) рецептов на пользователя.
+
+    Массивы возвращаются отсортированными по пользователю.
+    """
+    order = np.lexsort((-recipes, -weights, users))
+    users, recipes, weights = users[order], recipes[order], weights[order]
+    starts = group_starts(users)
+    rank = np.arange(len(users)) - np.repeat(
+        starts, np.diff(np.append(starts, len(users))))
+    keep = rank < limit
+    return users[keep], recipes[keep], weights[keep]
+
+
+def item_neighbors(vectors, chunk_size, processes):
+    """Матрицы номеров и близостей соседей всех рецептов."""
+    k = min(RECOMMENDATION_NEIGHBORS, max(len(vectors) - 1, 0))
+    neighbors = np.zeros((len(vectors), k), dtype=np.int64)
+    scores = np.zeros((len(vectors), k))
+    for rows, (top, top_scores) in map_blocks(
+            vectors, 'top', k, chunk_size, processes):
+        neighbors[rows], scores[rows] = top, top_scores
+    return neighbors, scores
+
+
+def user_top(local, items, weights, neighbors, scores, size):
+    """Лучшие рецепты блока пользователей.
+
+    local — номер пользователя в блоке для каждого его рецепта items.
+    Возвращает (local, item, score) по убыванию оценки внутри
+    пользователя, не больше RECOMMENDED_RECIPES_COUNT на пользователя,
+    без уже отмеченных пользователем рецептов.
+    """
+    candidate_scores = (scores[items] * weights[:, None]).ravel()
+    keys = (np.repeat(local, neighbors.shape[1]) * size
+            + neighbors[items].ravel())
+    positive = candidate_scores > 0
+    keys, inverse = np.unique(keys[positive], return_inverse=True)
+    totals = np.bincount(inverse, candidate_scores[positive])
+    fresh = ~np.isin(keys, local * size + items)
+    keys, totals = keys[fresh], totals[fresh]
+    owners = keys // size
+    order = np.lexsort((-totals, owners))
+    keys, totals, owners = keys[order], totals[order], owners[order]
+    starts = group_starts(owners)
+    rank = np.arange(len(keys)) - np.repeat(
+        starts, np.diff(np.append(starts, len(keys))))
+    keep = rank < RECOMMENDED_RECIPES_COUNT
+    return owners[keep], keys[keep] % size, totals[keep]
+
+
+def save_recommendations(user_range, rows):
+    """Заменить рекомендации пользователей с id в полуинтервале."""
+    first, last = user_range
+    with transaction.atomic():
+        RecipeRecommendation.objects.filter(
+            user_id__gt=first, user_id__lte=last).delete()
+        RecipeRecommendation.objects.bulk_create(
+            (RecipeRecommendation(user_id=user_id, recipe_id=recipe_id,
+                                  score=score)
+             for user_id, recipe_id, score in rows),
+            batch_size=READ_CHUNK_SIZE)
+
+
+def save_popular(recipe_ids, weights):
+    """Заменить общий рейтинг популярности."""
+    recipe_ids, inverse = np.unique(recipe_ids, return_inverse=True)
+    totals = np.bincount(inverse, weights)
+    order = np.argsort(-totals, kind='stable')[:POPULAR_RECIPES_COUNT]
+    with transaction.atomic():
+        RecipeRecommendation.objects.filter(user__isnull=True).delete()
+        RecipeRecommendation.objects.bulk_create(
+            RecipeRecommendation(recipe_id=recipe_id, score=score)
+            for recipe_id, score in zip(
+                recipe_ids[order].tolist(), totals[order].tolist()))
+
+
+def recompute_recommendations(chunk_size=1000, processes=1):
+    """Пересчитать рекомендации всех пользователей и рейтинг популярности.
+
+    Возвращает число пользователей с рекомендациями.
+    """
+    users, recipes, weights = load_interactions()
+    save_popular(recipes, weights)
+    users, recipes, weights = limit_per_user(
+        users, recipes, weights, RECOMMENDATION_USER_ITEMS_LIMIT)
+    recipe_ids = np.unique(recipes)
+    items = np.searchsorted(recipe_ids, recipes)
+    vectors = RecipeVectors(recipe_ids, items, users, weights)
+    neighbors, scores = item_neighbors(vectors, chunk_size, processes)
+
+    user_ids, starts = np.unique(users, return_index=True)
+    starts = np.append(starts, len(users))
+    previous = 0
+    for start in range(0, len(user_ids), chunk_size):
+        stop = min(start + chunk_size, len(user_ids))
+        begin, end = starts[start], starts[stop]
+        local = np.searchsorted(user_ids[start:stop], users[begin:end])
+        owners, top_items, totals = user_top(
+            local, items[begin:end], weights[begin:end],
+            neighbors, scores, len(vectors))
+        save_recommendations(
+            (previous, int(user_ids[stop - 1])),
+            zip(user_ids[start:stop][owners].tolist(),
+                recipe_ids[top_items].tolist(), totals.tolist()))
+        previous = int(user_ids[stop - 1])
+    # Пользователи без взаимодействий получают общий рейтинг.
+    RecipeRecommendation.objects.filter(user_id__gt=previous).delete()
+    return len(user_ids)
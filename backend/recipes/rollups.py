@@ -0,0 +1,78 @@
+"""Нормализованные итоги ингредиентов рецептов.
+
+Количества переводятся в базовые единицы (кг -> г, л -> мл, ...)
+и суммируются по названию ингредиента, поэтому «сахар, г» и
+«сахар, кг» в списке покупок складываются в одну строку.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from foodgram_backend.constants import UNIT_CONVERSIONS
+
+BATCH_SIZE = 1000
+
+
+def normalize(amount, measurement_unit):
+    """Количество и единица измерения в базовых единицах."""
+    measurement_unit = measurement_unit.strip()
+    base_unit, factor = UNIT_CONVERSIONS.get(
+        measurement_unit, (measurement_unit, 1))
+    return amount * factor, base_unit
+
+
+def compute_rollups(rows):
+    """Итоги по строкам (recipe_id, название, единица, количество)."""
+    totals = defaultdict(int)
+    for recipe_id, name, measurement_unit, amount in rows:
+        amount, measurement_unit = normalize(amount, measurement_unit)
+        totals[recipe_id, name, measurement_unit] += amount
+    return totals
+
+
+def save_rollups(recipe_ids, rows, rollup_model=None):
+    """Заменить итоги рецептов recipe_ids итогами по строкам rows.
+
+    Для только что созданных рецептов recipe_ids пуст: удалять нечего.
+    """
+    from recipes.models import RecipeRollup
+
+    rollup_model = rollup_model or RecipeRollup
+    totals = compute_rollups(rows)
+    # Внутри транзакции записи рецепта точка сохранения не нужна.
+    with transaction.atomic(savepoint=False):
+        if recipe_ids:
+            rollup_model.objects.filter(recipe_id__in=recipe_ids).delete()
+        rollup_model.objects.bulk_create(
+            rollup_model(
+                recipe_id=recipe_id,
+                name=name,
+                measurement_unit=measurement_unit,
+                amount=amount,
+            ) for (recipe_id, name, measurement_unit), amount
+            in totals.items())
+
+
+def recompute_rollups(recipe_ids=None, recipe_ingredient_model=None,
+                      rollup_model=None, recipe_model=None):
+    """Пересчитать итоги рецептов (всех, если id не заданы) блоками.
+
+    Модели можно передать явно (исторические модели в миграциях).
+    Возвращает число рецептов.
+    """
+    from recipes.models import Recipe, RecipeIngredient
+
+    recipe_ingredient_model = recipe_ingredient_model or RecipeIngredient
+    if recipe_ids is None:
+        recipe_ids = list((recipe_model or Recipe).objects.order_by(
+            'id').values_list('id', flat=True))
+    recipe_ids = list(recipe_ids)
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        batch = recipe_ids[start:start + BATCH_SIZE]
+        save_rollups(
+            batch,
+            recipe_ingredient_model.objects.filter(recipe_id__in=batch)
+            .values_list('recipe_id', 'ingredient__name',
+                         'ingredient__measurement_unit', 'amount'),
+            rollup_model)
+    return len(recipe_ids)
@@ -0,0 +1,118 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.rollups import recompute_rollups
+from recipes.tasks import schedule_update_similar
+
+# Пересчёт после изменения RecipeIngredient выполняет сам вызывающий код.
+refreshing_elsewhere = ContextVar('refreshing_elsewhere', default=False)
+
+
+def touch_recipes(recipes):
+    """Обновить дату изменения рецептов (без сигналов post_save)."""
+    recipes.update(updated_at=timezone.now())
+
+
+def refresh_recipes(recipe_ids):
+    """Пересчитать итоги, дату изменения и похожие рецепты."""
+    recompute_rollups(recipe_ids)
+    touch_recipes(Recipe.objects.filter(id__in=recipe_ids))
+    schedule_update_similar(recipe_ids)
+
+
+@contextmanager
+def refresh_handled():
+    """Изменения RecipeIngredient в блоке не вызывают refresh_recipes.
+
+    Для кода, который сам пересчитывает итоги, дату изменения
+    и похожие рецепты (RecipeWriteSerializer).
+    """
+    token = refreshing_elsewhere.set(True)
+    try:
+        yield
+    finally:
+        refreshing_elsewhere.reset(token)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    if refreshing_elsewhere.get():
+        return
+    transaction.on_commit(lambda: refresh_recipes([instance.recipe_id]))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if created:
+        return
+    recipe_ids = list(instance.recipe_ingredients.values_list(
+        'recipe_id', flat=True))
+    transaction.on_commit(lambda: refresh_recipes(recipe_ids))
+
+
+@receiver(post_save, sender=Tag)
+def tag_changed(sender, instance, created, **kwargs):
+    if not created:
+        touch_recipes(instance.recipes.all())
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    touch_recipes(instance.recipes.all())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            touch_recipes(Recipe.objects.filter(pk=instance.pk))
+            schedule_update_similar([instance.pk])
+    elif action == 'pre_clear':
+        touch_recipes(instance.recipes.all())
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+
+
+def delete_orphaned_image(name):
+    """Удалить файл картинки, если на него не ссылается ни один рецепт.
+
+    Одинаковые картинки хранятся одним файлом и могут быть общими.
+    Недавно загруженный файл не удаляется: та же картинка может быть
+    загружена для рецепта, который ещё не сохранён. Его удалит
+    cleanup_media, когда пройдёт IMAGE_GRACE_PERIOD.
+    """
+    storage = Recipe._meta.get_field('image').storage
+    # Время файла проверяется после ссылок: загрузка обновляет его
+    # до того, как рецепт со ссылкой будет сохранён.
+    if (name and not Recipe.objects.filter(image=name).exists()
+            and not storage.is_recent(name)):
+        storage.delete(name)
+
+
+def replace_image(previous, recipe):
+    """Удалить прежнюю картинку рецепта после коммита, если она сменилась.
+
+    Вызывает код, который меняет картинку сохранённого рецепта:
+    прежнее имя ему известно без лишнего запроса. Файлы, оставшиеся
+    после других изменений, удаляет команда cleanup_media.
+    """
+    if previous and previous != recipe.image.name:
+        transaction.on_commit(lambda: delete_orphaned_image(previous))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_image_deleted(sender, instance, **kwargs):
+    name = instance.image.name
+    transaction.on_commit(lambda: delete_orphaned_image(name))
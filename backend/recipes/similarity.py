@@ -0,0 +1,278 @@
+"""Похожие рецепты: косинусная близость по ингредиентам и тегам.
+
+Рецепт — разреженный вектор признаков (ингредиенты и теги) с весами
+IDF, нормированный по L2. Матрица хранится одновременно по строкам
+(признаки рецепта) и по столбцам (инвертированный индекс: рецепты
+с признаком), поэтому близость строки считается только с рецептами,
+у которых есть общие признаки, а суммы произведений копятся
+векторно через np.bincount.
+"""
+import multiprocessing
+
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import Count, Q
+
+from foodgram_backend.constants import (
+    SIMILAR_RECIPES_COUNT,
+    SIMILARITY_TAG_WEIGHT,
+)
+from recipes.models import Recipe, RecipeIngredient, RecipeNeighbor
+
+# Предел размера плотного блока близостей (строки x рецепты).
+MAX_BLOCK_CELLS = 2 ** 24
+
+
+def concat_ranges(starts, ends):
+    """Конкатенация np.arange(start, end) для всех пар без цикла."""
+    lengths = ends - starts
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.arange(lengths.sum()) - offsets + np.repeat(starts, lengths)
+
+
+class RecipeVectors:
+    """Нормированные векторы рецептов в форматах CSR и CSC."""
+
+    def __init__(self, recipe_ids, rows, features, weights,
+                 df=None, total=None):
+        """Векторы по элементам (строка, признак, вес).
+
+        df — частоты признаков элементов среди total рецептов; без них
+        частоты считаются по переданным рецептам.
+        """
+        self.recipe_ids = recipe_ids
+        size = len(recipe_ids)
+        features, features_count = self.compact(features)
+        if df is None:
+            df = np.bincount(features, minlength=features_count)[features]
+            total = size
+        values = weights * (np.log((1 + total) / (1 + df)) + 1)
+        norms = np.sqrt(np.bincount(rows, values ** 2, minlength=size))
+        values = values / norms[rows]
+
+        order = np.argsort(rows, kind='stable')
+        self.row_ptr = self.pointers(rows[order], size)
+        self.row_features = features[order]
+        self.row_values = values[order]
+
+        order = np.argsort(features, kind='stable')
+        self.col_ptr = self.pointers(features[order], features_count)
+        self.col_rows = rows[order]
+        self.col_values = values[order]
+
+    @staticmethod
+    def compact(features):
+        unique, inverse = np.unique(features, return_inverse=True)
+        return inverse, len(unique)
+
+    @staticmethod
+    def pointers(sorted_index, size):
+        return np.concatenate(
+            ([0], np.cumsum(np.bincount(sorted_index, minlength=size))))
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    def index(self, recipe_ids):
+        """Номера строк рецептов по их id."""
+        return np.searchsorted(self.recipe_ids, recipe_ids)
+
+    def scores(self, rows):
+        """Плотный блок близостей строк rows со всеми рецептами."""
+        entries = concat_ranges(self.row_ptr[rows], self.row_ptr[rows + 1])
+        local = np.repeat(
+            np.arange(len(rows)), self.row_ptr[rows + 1] - self.row_ptr[rows])
+        features = self.row_features[entries]
+        starts, ends = self.col_ptr[features], self.col_ptr[features + 1]
+        postings = concat_ranges(starts, ends)
+        counts = ends - starts
+        products = (
+            np.repeat(self.row_values[entries], counts)
+            * self.col_values[postings])
+        cells = np.repeat(local, counts) * len(self) + self.col_rows[postings]
+        return np.bincount(
+            cells, weights=products, minlength=len(rows) * len(self),
+        ).reshape(len(rows), len(self))
+
+    def top(self, rows, k):
+        """Номера и близости k лучших соседей строк rows по убыванию."""
+        scores = self.scores(rows)
+        scores[np.arange(len(rows)), rows] = 0
+        k = min(k, len(self) - 1)
+        if k < 1:
+            return (np.empty((len(rows), 0), dtype=np.int64),
+                    np.empty((len(rows), 0)))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        return (np.take_along_axis(top, order, axis=1),
+                np.take_along_axis(top_scores, order, axis=1))
+
+    def top_neighbors(self, rows, k=SIMILAR_RECIPES_COUNT):
+        """Список (recipe_id, neighbor_id, score) по k лучших на строку."""
+        top, top_scores = self.top(rows, k)
+        return [
+            (int(self.recipe_ids[row]), int(self.recipe_ids[neighbor]),
+             float(score))
+            for row, neighbors, row_scores in zip(rows, top, top_scores)
+            for neighbor, score in zip(neighbors, row_scores)
+            if score > 0
+        ]
+
+
+def pairs_array(queryset, *fields):
+    return np.array(
+        queryset.values_list(*fields), dtype=np.int64).reshape(-1, 2)
+
+
+def frequencies(queryset, field, feature_ids):
+    """Частоты признаков feature_ids среди всех рецептов."""
+    counts = dict(
+        queryset.filter(**{f'{field}__in': np.unique(feature_ids).tolist()})
+        .order_by()
+        .values(field)
+        .annotate(df=Count('id'))
+        .values_list(field, 'df'))
+    return np.array([counts[feature] for feature in feature_ids.tolist()],
+                    dtype=np.int64)
+
+
+def load_vectors(recipe_ids=None):
+    """Векторы рецептов из RecipeIngredient и тегов рецептов.
+
+    Без recipe_ids загружаются все рецепты. С recipe_ids — эти рецепты
+    и кандидаты в соседи: рецепты с общими ингредиентами. Тегов мало,
+    и общий тег есть почти у всех рецептов, поэтому рецепты, похожие
+    только тегами, в кандидаты не входят: их близость мала, а точный
+    результат даёт полный пересчёт. Частоты признаков и число рецептов
+    берутся агрегатами по всем рецептам, поэтому веса те же, что
+    при полной загрузке.
+    """
+    partial = recipe_ids is not None
+    recipes = Recipe.objects.all()
+    ingredients = RecipeIngredient.objects.all()
+    tags = Recipe.tags.through.objects.all()
+    if partial:
+        changed_ingredients = ingredients.filter(
+            recipe_id__in=recipe_ids).values('ingredient_id')
+        recipes = recipes.filter(
+            Q(id__in=recipe_ids)
+            | Q(id__in=ingredients.filter(
+                ingredient_id__in=changed_ingredients).values('recipe_id')))
+        ingredients = ingredients.filter(recipe_id__in=recipes.values('id'))
+        tags = tags.filter(recipe_id__in=recipes.values('id'))
+    recipe_ids = np.fromiter(
+        recipes.order_by('id').values_list('id', flat=True), dtype=np.int64)
+    ingredient_pairs = pairs_array(ingredients, 'recipe_id', 'ingredient_id')
+    tag_pairs = pairs_array(tags, 'recipe_id', 'tag_id')
+    # Признаки-теги нумеруются после всех ингредиентов.
+    tag_offset = ingredient_pairs[:, 1].max(initial=0) + 1
+    rows = np.searchsorted(
+        recipe_ids, np.concatenate((ingredient_pairs[:, 0], tag_pairs[:, 0])))
+    features = np.concatenate(
+        (ingredient_pairs[:, 1], tag_pairs[:, 1] + tag_offset))
+    weights = np.concatenate((
+        np.ones(len(ingredient_pairs)),
+        np.full(len(tag_pairs), SIMILARITY_TAG_WEIGHT)))
+    if partial:
+        df = np.concatenate((
+            frequencies(RecipeIngredient.objects, 'ingredient_id',
+                        ingredient_pairs[:, 1]),
+            frequencies(Recipe.tags.through.objects, 'tag_id',
+                        tag_pairs[:, 1])))
+        return RecipeVectors(recipe_ids, rows, features, weights,
+                             df, Recipe.objects.count())
+    return RecipeVectors(recipe_ids, rows, features, weights)
+
+
+def block_size(vectors, chunk_size):
+    """Число строк в блоке, чтобы плотный блок близостей влез в память."""
+    return max(1, min(chunk_size, MAX_BLOCK_CELLS // max(len(vectors), 1)))
+
+
+def save_neighbors(recipe_ids, neighbors):
+    """Заменить соседей рецептов recipe_ids."""
+    with transaction.atomic():
+        RecipeNeighbor.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeNeighbor.objects.bulk_create(
+            RecipeNeighbor(recipe_id=recipe_id, neighbor_id=neighbor_id,
+                           score=score)
+            for recipe_id, neighbor_id, score in neighbors)
+
+
+# Векторы для дочерних процессов: наследуются при fork без копирования.
+_vectors = None
+
+
+def _map_block(args):
+    method, rows, k = args
+    return rows, getattr(_vectors, method)(rows, k)
+
+
+def map_blocks(vectors, method, k, chunk_size=1000, processes=1):
+    """Результаты vectors.<method>(rows, k) по блокам строк.
+
+    Блоки считаются в processes дочерних процессах и отдаются
+    в порядке готовности парами (rows, результат).
+    """
+    global _vectors
+    _vectors = vectors
+    size = block_size(vectors, chunk_size)
+    blocks = [
+        (method, np.arange(start, min(start + size, len(vectors))), k)
+        for start in range(0, len(vectors), size)]
+    if processes < 2:
+        yield from map(_map_block, blocks)
+        return
+    # Соединения с БД не должны наследоваться дочерними процессами.
+    connections.close_all()
+    with multiprocessing.get_context('fork').Pool(processes) as pool:
+        yield from pool.imap_unordered(_map_block, blocks)
+
+
+def recompute_similar(chunk_size=1000, processes=1):
+    """Пересчитать соседей всех рецептов блоками в нескольких процессах.
+
+    Дочерние процессы только считают; в БД пишет родительский процесс.
+    """
+    vectors = load_vectors()
+    for rows, neighbors in map_blocks(
+            vectors, 'top_neighbors', SIMILAR_RECIPES_COUNT,
+            chunk_size, processes):
+        save_neighbors(vectors.recipe_ids[rows].tolist(), neighbors)
+    return len(vectors)
+
+
+def update_similar(recipe_ids):
+    """Пересчитать соседей изменённых рецептов.
+
+    Строки остальных рецептов не пересчитываются: изменённый рецепт
+    удаляется из их списков и добавляется только в списки своих новых
+    соседей (с обрезкой до SIMILAR_RECIPES_COUNT). Точный результат
+    даёт периодический полный пересчёт (recompute_similar).
+    """
+    vectors = load_vectors(recipe_ids)
+    recipe_ids = np.intersect1d(recipe_ids, vectors.recipe_ids)
+    neighbors = vectors.top_neighbors(vectors.index(recipe_ids))
+    reverse = [
+        (neighbor_id, recipe_id, score)
+        for recipe_id, neighbor_id, score in neighbors
+        if neighbor_id not in recipe_ids]
+    affected = {neighbor_id for neighbor_id, _, _ in reverse}
+    with transaction.atomic():
+        RecipeNeighbor.objects.filter(
+            neighbor_id__in=recipe_ids.tolist()).delete()
+        save_neighbors(recipe_ids.tolist(), neighbors)
+        RecipeNeighbor.objects.bulk_create(
+            RecipeNeighbor(recipe_id=recipe_id, neighbor_id=neighbor_id,
+                           score=score)
+            for recipe_id, neighbor_id, score in reverse)
+        lists = {}
+        for pk, recipe_id in RecipeNeighbor.objects.filter(
+                recipe_id__in=affected).order_by(
+                    'recipe_id', '-score').values_list('id', 'recipe_id'):
+            lists.setdefault(recipe_id, []).append(pk)
+        RecipeNeighbor.objects.filter(id__in=[
+            pk for pks in lists.values()
+            for pk in pks[SIMILAR_RECIPES_COUNT:]]).delete()
+    return len(neighbors)
@@ -0,0 +1,54 @@
+"""Хранилище картинок с именами по содержимому файла."""
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class HashedImageStorage(FileSystemStorage):
+    """Файл сохраняется как <каталог>/<ab>/<sha256><расширение>.
+
+    Изменённая картинка всегда получает новый адрес, поэтому
+    nginx отдаёт такие файлы с долгим immutable-кэшированием.
+    Одинаковые загрузки сохраняются на диск один раз.
+
+    Время изменения файла — время последней загрузки: повторная
+    загрузка обновляет его. Файл, загруженный меньше
+    IMAGE_GRACE_PERIOD назад, не удаляется как неиспользуемый
+    (is_recent): рецепт, который на него ссылается, может быть
+    ещё не сохранён.
+    """
+
+    def hashed_name(self, name, content):
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        digest = sha256.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            os.path.dirname(name), digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = self.hashed_name(name, content)
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return super().save(name, content, max_length=max_length)
+        return name
+
+    def is_recent(self, name):
+        """Загружен ли файл меньше IMAGE_GRACE_PERIOD назад."""
+        try:
+            modified = os.path.getmtime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return time.time() - modified < settings.IMAGE_GRACE_PERIOD
+
+
+image_storage = HashedImageStorage()
@@ -0,0 +1,37 @@
+from django.db import transaction
+
+from jobs.registry import enqueue, register
+from recipes.recommendations import recompute_recommendations
+from recipes.rollups import recompute_rollups
+from recipes.similarity import update_similar
+
+
+@register('recipes.recompute_rollups')
+def recompute_rollups_task(recipe_ids=None):
+    """Пересчитать итоги ингредиентов рецептов (всех, если id не заданы)."""
+    return {'recipes': recompute_rollups(recipe_ids)}
+
+
+@register('recipes.recompute_recommendations')
+def recompute_recommendations_task(chunk_size=1000, processes=1):
+    """Пересчитать рекомендации пользователей и рейтинг популярности."""
+    return {'users': recompute_recommendations(chunk_size, processes)}
+
+
+@register('recipes.update_similar')
+def update_similar_task(recipe_ids):
+    """Пересчитать похожие рецепты для изменённых рецептов."""
+    return {'neighbors': update_similar(recipe_ids)}
+
+
+def schedule_update_similar(recipe_ids, unique=True):
+    """Поставить пересчёт похожих рецептов в очередь после коммита.
+
+    Все рецепты пересчитываются одной задачей. Для новых рецептов
+    (unique=False) ждущих задач заведомо нет.
+    """
+    recipe_ids = sorted(set(recipe_ids))
+    if not recipe_ids:
+        return
+    transaction.on_commit(lambda: enqueue(
+        'recipes.update_similar', unique=unique, recipe_ids=recipe_ids))
@@ -2,6 +2,9 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import Group
 
+from foodgram_backend.admin_utils import EstimatedCountPaginator
+from foodgram_backend.counting import count_subquery
+from recipes.models import Recipe
 from users.models import Subscription, User
 
 admin.site.unregister(Group)
@@ -13,19 +16,31 @@ class UserAdmin(BaseUserAdmin):
         'username', 'email',
         'first_name', 'last_name',
         'get_recipe_count', 'get_following')
-    list_filter = ('email', 'username')
+    list_filter = ('is_staff', 'is_active')
     readonly_fields = ('get_following', 'get_recipe_count')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipe_count=count_subquery(Recipe.objects, 'author'),
+            follower_count=count_subquery(Subscription.objects, 'author'),
+        )
 
     @admin.display(description='Рецептов')
     def get_recipe_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipe_count
 
     @admin.display(description='Подписчиков')
     def get_following(self, obj):
-        return obj.following.count()
+        return obj.follower_count
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ('user', 'author')
-    list_filter = ('user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    autocomplete_fields = ('user', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
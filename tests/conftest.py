@@ -0,0 +1,68 @@
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+REPLICA = 'replica'
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings():
+    """Вторая база SQLite без зеркалирования: реплика со своими данными."""
+    settings.DATABASES.setdefault(REPLICA, {
+        **settings.DATABASES['default'],
+        'NAME': 'replica',
+        'TEST': {**settings.DATABASES['default']['TEST'], 'NAME': None},
+    })
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    """Кэш ответов в памяти процесса: тесты идут в одном процессе."""
+    settings.RESPONSE_CACHE = True
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def replica(settings):
+    """Включить чтение с реплики для безопасных запросов."""
+    settings.DATABASE_REPLICAS = [REPLICA]
+    return REPLICA
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(
+        username='author', email='author@example.com', password='password',
+        first_name='Имя', last_name='Фамилия')
+
+
+@pytest.fixture
+def tag():
+    return Tag.objects.create(
+        name='Завтрак', color='#E26C2D', slug='breakfast')
+
+
+@pytest.fixture
+def ingredient():
+    return Ingredient.objects.create(name='мука', measurement_unit='г')
+
+
+@pytest.fixture
+def recipe(author, tag, ingredient):
+    recipe = Recipe.objects.create(
+        author=author, name='Блины', text='Смешать и пожарить.',
+        cooking_time=20, image='images/pancakes.jpg')
+    recipe.tags.add(tag)
+    RecipeIngredient.objects.create(
+        recipe=recipe, ingredient=ingredient, amount=200)
+    return recipe
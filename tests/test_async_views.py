@@ -0,0 +1,189 @@
+import asyncio
+import importlib
+import threading
+import time
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory
+from django.urls import clear_url_caches, resolve
+from rest_framework.authtoken.models import Token
+
+from api import async_views, cache, urls
+from api.throttles import TokenBucketThrottle
+from api.views import RecipeViewSet
+from foodgram_backend.db_router import use_replica
+from foodgram_backend.middleware import (
+    ProfilingMiddleware,
+    ReadReplicaMiddleware,
+)
+from foodgram_backend.profiling import read_stacks, sample_thread
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def sync_list(path, **headers):
+    response = RecipeViewSet.as_view({'get': 'list'})(
+        RequestFactory().get(path, **headers))
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def async_request(path, method='get', **meta):
+    # AsyncRequestFactory в Django 3.2 не принимает заголовки.
+    request = getattr(AsyncRequestFactory(), method)(path)
+    request.META.update(meta)
+    return request
+
+
+def async_call(view, path, **kwargs):
+    return async_to_sync(view)(async_request(path), **kwargs)
+
+
+def test_async_recipe_list_is_the_viewset_response(recipe):
+    response = async_call(async_views.recipe_list, '/api/recipes/')
+    assert response.status_code == 200
+    assert response['ETag']
+    expected = sync_list('/api/recipes/')
+    assert response.content == expected.content
+    assert response['ETag'] == expected['ETag']
+    assert sync_list(
+        '/api/recipes/', HTTP_IF_NONE_MATCH=response['ETag']
+    ).status_code == 304
+    request = async_request(
+        '/api/recipes/', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert async_to_sync(async_views.recipe_list)(request).status_code == 304
+
+
+def test_async_recipe_detail(recipe):
+    response = async_call(
+        async_views.recipe_detail, f'/api/recipes/{recipe.id}/',
+        pk=str(recipe.id))
+    assert response.status_code == 200
+    assert response['ETag']
+    assert async_call(
+        async_views.recipe_detail, '/api/recipes/0/', pk='0'
+    ).status_code == 404
+
+
+def test_async_ingredient_list_is_throttled(monkeypatch, ingredient):
+    monkeypatch.setitem(
+        TokenBucketThrottle.THROTTLE_RATES, 'autocomplete', '1/min')
+    statuses = [
+        async_call(async_views.ingredient_list, '/api/ingredients/')
+        .status_code for _ in range(3)]
+    assert 429 in statuses
+
+
+def test_replica_middleware_runs_async():
+    seen = []
+
+    async def get_response(request):
+        seen.append(use_replica.get())
+        return HttpResponse()
+
+    middleware = ReadReplicaMiddleware(get_response)
+    assert asyncio.iscoroutinefunction(middleware)
+    response = async_to_sync(middleware)(AsyncRequestFactory().get('/'))
+    assert settings.REPLICA_PIN_COOKIE not in response.cookies
+    response = async_to_sync(middleware)(AsyncRequestFactory().post('/'))
+    assert settings.REPLICA_PIN_COOKIE in response.cookies
+    assert seen == [True, False]
+    assert not asyncio.iscoroutinefunction(
+        ReadReplicaMiddleware(lambda request: HttpResponse()))
+
+
+def test_profiling_samples_pool_threads(settings, tmp_path):
+    settings.PROFILING_TOKEN = 'secret'
+    settings.PROFILING_INTERVAL = 0.001
+    settings.PROFILING_DIR = str(tmp_path)
+
+    def slow_view():
+        with sample_thread():
+            time.sleep(0.05)
+        return HttpResponse()
+
+    async def get_response(request):
+        return await sync_to_async(slow_view, thread_sensitive=False)()
+
+    middleware = ProfilingMiddleware(get_response)
+    # Как под сервером ASGI: без внешнего async_to_sync.
+    asyncio.run(middleware(async_request('/', HTTP_X_PROFILE='secret')))
+    stacks = read_stacks(tmp_path.iterdir())
+    assert stacks
+    # Поток синхронного кода запроса простаивает и в сэмплы не попадает.
+    assert all('slow_view' in stack for stack in stacks)
+
+
+@pytest.fixture
+def async_urls(settings):
+    settings.ASYNC_READ_VIEWS = True
+    clear_url_caches()
+    yield importlib.reload(urls)
+    settings.ASYNC_READ_VIEWS = False
+    importlib.reload(urls)
+    clear_url_caches()
+
+
+@pytest.mark.parametrize('path, view_name', (
+    ('/api/recipes/1/', 'recipes-detail'),
+    ('/api/recipes/download_shopping_cart/', 'recipes-download-shopping-cart'),
+    ('/api/recipes/export_shopping_cart/', 'recipes-export-shopping-cart'),
+    ('/api/recipes/recommended/', 'recipes-recommended'),
+    ('/api/recipes/1/similar/', 'recipes-similar'),
+    ('/api/ingredients/snapshot/', 'ingredients-snapshot'),
+    ('/api/tags/1/', 'tags-detail'),
+))
+def test_async_routes_leave_actions_to_router(async_urls, path, view_name):
+    match = resolve(path[len('/api'):], urlconf=async_urls)
+    assert match.url_name == view_name
+    assert (match.func.__module__ == async_views.__name__) == (
+        view_name in ('recipes-detail', 'tags-detail'))
+
+
+def test_async_list_loads_user_sets_in_parallel(recipe, author, monkeypatch):
+    threads = {}
+    get_fragments = RecipeViewSet.get_fragments
+    get_user_sets = cache.get_user_sets
+
+    def record(name, func):
+        def wrapper(*args, **kwargs):
+            threads[name] = threading.get_ident()
+            return func(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(
+        RecipeViewSet, 'get_fragments', record('fragments', get_fragments))
+    monkeypatch.setattr(
+        cache, 'get_user_sets', record('user_sets', get_user_sets))
+    author.favorites.create(recipe=recipe)
+    token = Token.objects.create(user=author)
+    request = async_request(
+        '/api/recipes/', HTTP_AUTHORIZATION=f'Token {token.key}')
+    response = async_to_sync(async_views.recipe_list)(request)
+    assert response.status_code == 200
+    assert response.data['results'][0]['is_favorited'] is True
+    assert threads['fragments'] != threads['user_sets']
+
+
+def test_profiling_samples_sync_views_under_asgi(settings, tmp_path):
+    settings.PROFILING_TOKEN = 'secret'
+    settings.PROFILING_INTERVAL = 0.001
+    settings.PROFILING_DIR = str(tmp_path)
+
+    def slow_sync_view():
+        time.sleep(0.05)
+        return HttpResponse()
+
+    async def get_response(request):
+        # Так Django вызывает синхронное представление под ASGI.
+        return await sync_to_async(slow_sync_view, thread_sensitive=True)()
+
+    middleware = ProfilingMiddleware(get_response)
+    asyncio.run(middleware(async_request('/', HTTP_X_PROFILE='secret')))
+    stacks = read_stacks(tmp_path.iterdir())
+    assert stacks
+    assert all('slow_sync_view' in stack for stack in stacks)
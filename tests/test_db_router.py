@@ -0,0 +1,89 @@
+import pytest
+from django.conf import settings
+
+from api import cache
+from foodgram_backend.db_router import use_replica
+from recipes.models import Tag
+from users.models import User
+
+pytestmark = pytest.mark.django_db(databases=['default', 'replica'])
+
+
+def create_tags(using):
+    return Tag.objects.using(using).create(
+        name=f'Тег {using}', color='#FF0000', slug=f'tag-{using}')
+
+
+def tag_slugs(response):
+    assert response.status_code == 200
+    return [tag['slug'] for tag in response.json()]
+
+
+def test_reads_outside_request_go_to_primary(replica):
+    assert Tag.objects.all().db == 'default'
+
+
+def test_reads_in_safe_request_go_to_replica(replica):
+    token = use_replica.set(True)
+    try:
+        assert Tag.objects.all().db == replica
+    finally:
+        use_replica.reset(token)
+
+
+def test_cache_fill_reads_from_primary(replica):
+    token = use_replica.set(True)
+    try:
+        cache.get_tag_versions((cache.CATALOGUE_TAG,))
+        assert Tag.objects.all().db == 'default'
+    finally:
+        use_replica.reset(token)
+
+
+def test_write_pins_rest_of_request_to_primary(replica):
+    token = use_replica.set(True)
+    try:
+        create_tags('default')
+        assert Tag.objects.all().db == 'default'
+    finally:
+        use_replica.reset(token)
+
+
+def test_no_replicas_configured(settings):
+    settings.DATABASE_REPLICAS = []
+    token = use_replica.set(True)
+    try:
+        assert Tag.objects.all().db == 'default'
+    finally:
+        use_replica.reset(token)
+
+
+def test_get_reads_replica(client, replica):
+    create_tags('default')
+    create_tags(replica)
+    assert tag_slugs(client.get('/api/tags/')) == ['tag-replica']
+    assert settings.REPLICA_PIN_COOKIE not in client.cookies
+
+
+def test_write_goes_to_primary_and_pins_reads(client, replica):
+    create_tags('default')
+    create_tags(replica)
+    response = client.post('/api/users/', {
+        'email': 'cook@example.com', 'username': 'cook',
+        'first_name': 'Имя', 'last_name': 'Фамилия',
+        'password': 'Sup3r-secret-pass'})
+    assert response.status_code == 201
+    assert User.objects.using('default').filter(username='cook').exists()
+    assert not User.objects.using(replica).exists()
+    cookie = client.cookies[settings.REPLICA_PIN_COOKIE]
+    assert cookie['max-age'] == settings.REPLICA_PIN_SECONDS
+    assert tag_slugs(client.get('/api/tags/')) == ['tag-default']
+
+    client.cookies.pop(settings.REPLICA_PIN_COOKIE)
+    assert tag_slugs(client.get('/api/tags/')) == ['tag-replica']
+
+
+def test_failed_write_does_not_pin(client, replica):
+    response = client.post('/api/users/', {'email': 'invalid'})
+    assert response.status_code == 400
+    assert settings.REPLICA_PIN_COOKIE not in client.cookies
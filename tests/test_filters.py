@@ -0,0 +1,27 @@
+import pytest
+
+from api.filters import RecipeFilter
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+
+def filtered(**params):
+    return RecipeFilter(params, queryset=Recipe.objects.all()).qs
+
+
+@pytest.mark.parametrize('mode', ('any', 'all'))
+def test_unknown_tags_give_empty_queryset(recipe, mode):
+    queryset = filtered(tags=['unknown'], tags_mode=mode)
+    assert queryset.query.is_empty()
+    assert list(queryset) == []
+
+
+@pytest.mark.parametrize('mode, slugs, found', (
+    ('any', ['breakfast', 'unknown'], True),
+    ('all', ['breakfast'], True),
+    ('all', ['breakfast', 'unknown'], False),
+))
+def test_tags_modes(recipe, mode, slugs, found):
+    assert list(filtered(tags=slugs, tags_mode=mode)) == (
+        [recipe] if found else [])
@@ -0,0 +1,81 @@
+from contextlib import contextmanager
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.registry import enqueue
+from jobs.worker import claim_job, enqueue_periodic
+
+pytestmark = pytest.mark.django_db
+
+
+def stale_job(attempts):
+    return Job.objects.create(
+        name='recipes.recompute_rollups', status=Job.RUNNING,
+        attempts=attempts, max_attempts=3,
+        locked_at=timezone.now() - timedelta(days=1))
+
+
+def test_stale_job_is_reclaimed_as_new_attempt():
+    job = stale_job(attempts=1)
+    assert claim_job() == job
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (Job.RUNNING, 2)
+
+
+def test_stale_job_fails_after_max_attempts():
+    exhausted = stale_job(attempts=3)
+    pending = Job.objects.create(name='recipes.recompute_rollups')
+    assert claim_job() == pending
+    exhausted.refresh_from_db()
+    assert exhausted.status == Job.FAILED
+    assert exhausted.attempts == 3
+    assert exhausted.finished is not None
+    assert claim_job() is None
+
+
+def test_periodic_job_is_enqueued_once_per_period(settings):
+    due = {}
+    enqueue_periodic(due)
+    job = Job.objects.get(name='changes.compact')
+    enqueue_periodic({})
+    assert Job.objects.filter(name='changes.compact').count() == 1
+    job.created = timezone.now() - timedelta(
+        seconds=settings.CHANGES_COMPACT_INTERVAL + 1)
+    job.status = Job.DONE
+    job.save()
+    enqueue_periodic(due)
+    assert Job.objects.filter(name='changes.compact').count() == 1
+    enqueue_periodic({})
+    assert Job.objects.filter(
+        name='changes.compact', status=Job.PENDING).count() == 1
+
+
+class PostgresLocks:
+    """Соединение для lock_unique: запоминает ключи advisory-блокировок."""
+
+    vendor = 'postgresql'
+
+    def __init__(self):
+        self.keys = []
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def execute(self, sql, params):
+        assert 'pg_advisory_xact_lock' in sql
+        self.keys.extend(params)
+
+
+def test_unique_enqueue_locks_same_jobs_together(monkeypatch):
+    locks = PostgresLocks()
+    monkeypatch.setattr('jobs.registry.connection', locks)
+    first = enqueue('recipes.update_similar', unique=True, recipe_ids=[1])
+    assert enqueue(
+        'recipes.update_similar', unique=True, recipe_ids=[1]) == first
+    enqueue('recipes.update_similar', unique=True, recipe_ids=[2])
+    assert locks.keys[0] == locks.keys[1] != locks.keys[2]
+    assert Job.objects.count() == 2
@@ -0,0 +1,43 @@
+import pytest
+
+from api import cache
+from api.paginations import CheapCountPaginator
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+
+def test_unknown_tag_gives_empty_page(client, recipe):
+    response = client.get('/api/recipes/?tags=unknown')
+    assert response.status_code == 200
+    assert response.data['count'] == 0
+    assert response.data['results'] == []
+
+
+@pytest.mark.parametrize('cache_tags', (None, (cache.RECIPE_LIST_TAG,)))
+def test_count_of_always_false_condition(
+        recipe, cache_tags, django_assert_num_queries):
+    paginator = CheapCountPaginator(
+        Recipe.objects.filter(pk__in=[]), 6, cache_tags=cache_tags)
+    with django_assert_num_queries(0):
+        assert paginator.count == 0
+
+
+def test_exact_count_is_cached(
+        recipe, django_assert_num_queries,
+        django_capture_on_commit_callbacks):
+    def count():
+        return CheapCountPaginator(
+            Recipe.objects.filter(name=recipe.name), 6,
+            cache_tags=(cache.RECIPE_LIST_TAG,)).count
+
+    with django_assert_num_queries(1):
+        assert count() == 1
+    with django_assert_num_queries(0):
+        assert count() == 1
+    with django_capture_on_commit_callbacks(execute=True):
+        Recipe.objects.create(
+            author=recipe.author, name=recipe.name, text=recipe.text,
+            cooking_time=recipe.cooking_time, image=recipe.image)
+    with django_assert_num_queries(1):
+        assert count() == 2
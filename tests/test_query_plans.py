@@ -0,0 +1,72 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from api.management.commands.explain_queries import (
+    LARGE_TABLES,
+    SEQ_SCAN,
+    Command,
+)
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+SEED = {'users': 50, 'recipes': 500, 'favorites': 2000, 'carts': 500,
+        'subscriptions': 200}
+
+
+@pytest.fixture
+def seeded_user():
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(100))
+    Tag.objects.bulk_create(
+        Tag(name=f'Тег {number}', color=f'#00000{number}',
+            slug=f'tag-{number}')
+        for number in range(5))
+    call_command('seed_data', **SEED, stdout=StringIO())
+    return User.objects.filter(
+        favorites__isnull=False, shoppingcarts__isnull=False,
+        follower__isnull=False).first()
+
+
+def test_seed_data_links_only_new_recipes(seeded_user):
+    assert not Recipe.objects.filter(tags__isnull=True).exists()
+    assert not Recipe.objects.filter(recipe_ingredients__isnull=True).exists()
+    links = Recipe.tags.through.objects.count()
+    call_command('seed_data', users=0, recipes=0, favorites=0, carts=0,
+                 subscriptions=0, stdout=StringIO())
+    assert Recipe.tags.through.objects.count() == links
+
+
+def test_hot_queries_do_not_scan_large_tables(seeded_user):
+    pattern = SEQ_SCAN[connection.vendor]
+    for name, queryset in Command().hot_queries(
+            seeded_user, Tag.objects.first()).items():
+        plan = queryset.explain()
+        assert not set(pattern.findall(plan)) & set(LARGE_TABLES), (
+            f'{name}:\n{plan}')
+
+
+@pytest.mark.parametrize('url, authenticated, queries', (
+    ('/api/recipes/', False, 6),
+    ('/api/recipes/?tags=tag-1&tags=tag-2', False, 7),
+    ('/api/recipes/?author={user}', False, 7),
+    ('/api/recipes/{recipe}/', False, 4),
+    ('/api/recipes/', True, 7),
+    ('/api/recipes/?is_favorited=1', True, 7),
+    ('/api/recipes/?is_in_shopping_cart=1', True, 7),
+    ('/api/recipes/{recipe}/', True, 5),
+    ('/api/users/subscriptions/', True, 3),
+    ('/api/recipes/download_shopping_cart/', True, 2),
+))
+def test_query_counts(seeded_user, client, django_assert_num_queries,
+                      url, authenticated, queries):
+    if authenticated:
+        client.force_authenticate(seeded_user)
+    url = url.format(user=seeded_user.id, recipe=Recipe.objects.first().id)
+    with django_assert_num_queries(queries):
+        assert client.get(url).status_code == 200
@@ -0,0 +1,100 @@
+import pytest
+from django.utils import timezone
+
+from api import cache
+from recipes.models import Recipe
+from users.models import Subscription
+
+pytestmark = pytest.mark.django_db
+
+
+def test_list_changes_after_deleting_older_recipe(
+        client, recipe, author, django_capture_on_commit_callbacks):
+    newer = Recipe.objects.create(
+        author=author, name='Оладьи', text='Смешать и пожарить.',
+        cooking_time=15, image='images/fritters.jpg')
+    response = client.get('/api/recipes/')
+    assert 'Last-Modified' not in response
+    assert client.get(
+        '/api/recipes/', HTTP_IF_NONE_MATCH=response['ETag']
+    ).status_code == 304
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.delete()
+    response = client.get(
+        '/api/recipes/', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 200
+    assert [item['id'] for item in response.data['results']] == [newer.id]
+
+
+def test_recipe_detail_keeps_last_modified(client, recipe):
+    response = client.get(f'/api/recipes/{recipe.id}/')
+    assert response['Last-Modified']
+    assert client.get(
+        f'/api/recipes/{recipe.id}/',
+        HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+    ).status_code == 304
+
+
+def test_cache_invalidated_after_commit(
+        recipe, django_capture_on_commit_callbacks):
+    tags = (cache.recipe_tag(recipe.id), cache.RECIPE_LIST_TAG)
+    versions = cache.get_tag_versions(tags)
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.name = 'Оладьи'
+        recipe.save()
+        # До фиксации запрос читает прежние данные: версии те же.
+        assert cache.get_tag_versions(tags) == versions
+    assert not set(cache.get_tag_versions(tags).values()) & set(
+        versions.values())
+
+
+def test_process_local_cache_keeps_no_responses(client, recipe, settings):
+    settings.RESPONSE_CACHE = False
+    client.get(f'/api/recipes/{recipe.id}/')
+    Recipe.objects.filter(pk=recipe.pk).update(name='Оладьи')
+    response = client.get(f'/api/recipes/{recipe.id}/')
+    assert response.data['name'] == 'Оладьи'
+
+
+def test_list_etag_does_not_depend_on_cache(client, recipe, settings):
+    # Без общего кэша воркеры не видят инвалидаций друг друга:
+    # ETag строится только по данным БД.
+    settings.RESPONSE_CACHE = False
+    etag = client.get('/api/recipes/')['ETag']
+    assert client.get(
+        '/api/recipes/', HTTP_IF_NONE_MATCH=etag).status_code == 304
+    for change in (
+        lambda: recipe.tags.clear(),
+        lambda: Recipe.objects.filter(pk=recipe.pk).update(
+            updated_at=timezone.now()),
+        lambda: recipe.delete(),
+    ):
+        change()
+        response = client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        etag = response['ETag']
+
+
+def test_subscription_previews_match_author_recipes(
+        client, recipe, author, django_user_model):
+    for number in range(3):
+        Recipe.objects.create(
+            author=author, name=f'Рецепт {number}', text='Текст.',
+            cooking_time=10, image=f'images/{number}.jpg')
+    other = django_user_model.objects.create_user(
+        username='other', email='other@example.com', password='password')
+    Recipe.objects.create(
+        author=other, name='Суп', text='Сварить.', cooking_time=30,
+        image='images/soup.jpg')
+    reader = django_user_model.objects.create_user(
+        username='reader', email='reader@example.com', password='password')
+    Subscription.objects.create(user=reader, author=author)
+    Subscription.objects.create(user=reader, author=other)
+    client.force_authenticate(reader)
+    response = client.get('/api/users/subscriptions/?recipes_limit=2')
+    previews = {item['id']: item['recipes']
+                for item in response.data['results']}
+    recipes = client.get(f'/api/users/{author.id}/recipes/').data['results']
+    assert previews[author.id] == recipes[:2]
+    assert [item['name'] for item in previews[other.id]] == ['Суп']
+    assert previews[other.id][0]['image'].startswith('http://testserver/')
@@ -0,0 +1,136 @@
+import os
+from base64 import b64decode
+from io import StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import get_user_sets
+from changes.models import Change
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeRollup,
+    Tag,
+)
+
+pytestmark = pytest.mark.django_db
+
+# Красный пиксель PNG.
+IMAGE = ('data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAQMAAAAl21'
+         'bKAAAAA1BMVEX/AAAZ4gk3AAAACklEQVQI12NgAAAAAgAB4iG8MwAAAABJRU5Er'
+         'kJggg==')
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+def recipe_data(tags, ingredients):
+    return {
+        'name': 'Блины', 'text': 'Смешать и пожарить.', 'cooking_time': 20,
+        'image': IMAGE, 'tags': [tag.id for tag in tags],
+        'ingredients': [{'id': ingredient.id, 'amount': amount}
+                        for ingredient, amount in ingredients]}
+
+
+def statements(queries):
+    return [query['sql'] for query in queries.captured_queries
+            if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+
+
+def test_create_queries(client, author, tag, ingredient):
+    client.force_authenticate(author)
+    # Флаги пользователя для ответа обычно уже в кэше.
+    get_user_sets(author)
+    Change.objects.all().delete()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(
+            '/api/recipes/', recipe_data([tag], [(ingredient, 200)]),
+            format='json')
+    assert response.status_code == 201
+    # Проверка тегов и ингредиентов, затем по INSERT на таблицу:
+    # рецепт, теги, ингредиенты, итоги и журнал изменений.
+    assert len(statements(queries)) == 7
+    assert Change.objects.count() == 3
+
+
+def test_update_writes_only_differences(
+        client, author, recipe, tag, ingredient, monkeypatch,
+        django_capture_on_commit_callbacks):
+    deleted, refreshed = [], []
+    monkeypatch.setattr(
+        'recipes.signals.delete_orphaned_image', deleted.append)
+    monkeypatch.setattr('recipes.signals.refresh_recipes', refreshed.append)
+    lunch = Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+    eggs = Ingredient.objects.create(name='яйца', measurement_unit='шт')
+    milk = Ingredient.objects.create(name='молоко', measurement_unit='мл')
+    RecipeIngredient.objects.create(recipe=recipe, ingredient=eggs, amount=2)
+    Change.objects.all().delete()
+    client.force_authenticate(author)
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.put(
+            f'/api/recipes/{recipe.id}/',
+            recipe_data([lunch], [(ingredient, 300), (milk, 100)]),
+            format='json')
+    assert response.status_code == 200
+    assert set(recipe.tags.all()) == {lunch}
+    assert set(RecipeIngredient.objects.filter(recipe=recipe).values_list(
+        'ingredient__name', 'amount')) == {('мука', 300), ('молоко', 100)}
+    assert set(RecipeRollup.objects.filter(recipe=recipe).values_list(
+        'name', 'amount')) == {('мука', 300), ('молоко', 100)}
+    assert set(Change.objects.values_list('key', 'data__amount')) == {
+        (str(recipe.id), None),
+        (f'{recipe.id}-{tag.id}', None),
+        (f'{recipe.id}-{lunch.id}', None),
+        (f'{recipe.id}-{ingredient.id}', 300),
+        (f'{recipe.id}-{eggs.id}', None),
+        (f'{recipe.id}-{milk.id}', 100)}
+    assert deleted == ['images/pancakes.jpg']
+    # Итоги пересчитал сериализатор, удаление яиц их не пересчитывает.
+    assert refreshed == []
+
+
+def test_reupload_keeps_image_of_deleted_recipe(
+        client, author, tag, ingredient, django_capture_on_commit_callbacks):
+    client.force_authenticate(author)
+    data = recipe_data([tag], [(ingredient, 200)])
+    first = client.post('/api/recipes/', data, format='json').data['id']
+    storage = Recipe._meta.get_field('image').storage
+    name = Recipe.objects.get(pk=first).image.name
+    # Картинка загружена давно.
+    os.utime(storage.path(name), (0, 0))
+    # Та же картинка загружается снова, пока удаляется первый рецепт:
+    # повторная загрузка обновляет время файла, и он не удаляется.
+    assert storage.save('images/pancakes.png', ContentFile(
+        b64decode(IMAGE.partition(',')[2]))) == name
+    with django_capture_on_commit_callbacks(execute=True):
+        Recipe.objects.filter(pk=first).delete()
+    assert storage.exists(name)
+    call_command('cleanup_media', stdout=StringIO())
+    assert storage.exists(name)
+    os.utime(storage.path(name), (0, 0))
+    call_command('cleanup_media', stdout=StringIO())
+    assert not storage.exists(name)
+
+
+def test_write_response_matches_read_order(client, author, tag):
+    names = ('яйца', 'Мука', 'ёлочка', 'анис')
+    ingredients = [
+        Ingredient.objects.create(name=name, measurement_unit='г')
+        for name in names]
+    lunch = Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+    client.force_authenticate(author)
+    response = client.post(
+        '/api/recipes/',
+        recipe_data([tag, lunch], [(item, 1) for item in ingredients]),
+        format='json')
+    assert response.status_code == 201
+    read = client.get(f'/api/recipes/{response.data["id"]}/').data
+    assert response.data['ingredients'] == read['ingredients']
+    assert response.data['tags'] == read['tags']
@@ -0,0 +1,32 @@
+import pytest
+
+from api.shopping_cart import get_cart_ingredients
+from recipes.models import (
+    Ingredient,
+    RecipeIngredient,
+    RecipeRollup,
+    ShoppingCart,
+)
+from recipes.rollups import recompute_rollups
+
+pytestmark = pytest.mark.django_db
+
+
+def test_recompute_after_bulk_create(recipe):
+    kilograms = Ingredient.objects.create(name='мука', measurement_unit='кг')
+    RecipeIngredient.objects.bulk_create(
+        [RecipeIngredient(recipe=recipe, ingredient=kilograms, amount=2)])
+    assert recompute_rollups() == 1
+    assert list(RecipeRollup.objects.values_list(
+        'name', 'measurement_unit', 'amount')) == [('мука', 'г', 2200)]
+
+
+def test_recipe_write_updates_cart_totals(
+        recipe, author, django_capture_on_commit_callbacks):
+    kilograms = Ingredient.objects.create(name='мука', measurement_unit='кг')
+    with django_capture_on_commit_callbacks(execute=True):
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=kilograms, amount=1)
+    ShoppingCart.objects.create(user=author, recipe=recipe, multiplier=3)
+    assert list(get_cart_ingredients(author)) == [
+        {'name': 'мука', 'measurement_unit': 'г', 'total': 3600}]
@@ -0,0 +1,59 @@
+import pytest
+
+from api.shopping_cart import get_cart_ingredients
+from foodgram_backend.constants import MAX_AMOUNT, MAX_MULTIPLIER
+from jobs.models import Job
+from recipes.models import Ingredient, RecipeIngredient, ShoppingCart
+from recipes.rollups import recompute_rollups
+
+pytestmark = pytest.mark.django_db
+
+
+def test_cart_total_does_not_overflow_int4(recipe, author):
+    kilograms = Ingredient.objects.create(name='соль', measurement_unit='кг')
+    RecipeIngredient.objects.create(
+        recipe=recipe, ingredient=kilograms, amount=MAX_AMOUNT)
+    recompute_rollups([recipe.id])
+    ShoppingCart.objects.create(
+        user=author, recipe=recipe, multiplier=MAX_MULTIPLIER)
+    totals = {row['name']: row['total']
+              for row in get_cart_ingredients(author)}
+    assert totals['соль'] == MAX_AMOUNT * 1000 * MAX_MULTIPLIER > 2 ** 31
+
+
+@pytest.mark.parametrize('method', ('post', 'patch'))
+def test_multiplier_is_capped(client, recipe, author, method):
+    client.force_authenticate(author)
+    url = f'/api/recipes/{recipe.id}/shopping_cart/'
+    if method == 'patch':
+        client.post(url)
+    response = getattr(client, method)(
+        url, {'multiplier': MAX_MULTIPLIER + 1}, format='json')
+    assert response.status_code == 400
+
+
+def test_large_cart_is_exported_by_post_only(
+        client, recipe, author, monkeypatch):
+    monkeypatch.setattr('api.views.REQUEST_ROWS_BUDGET', 0)
+    client.force_authenticate(author)
+    ShoppingCart.objects.create(user=author, recipe=recipe)
+    response = client.get('/api/recipes/download_shopping_cart/')
+    assert response.status_code == 409
+    assert not Job.objects.exists()
+    url = '/api/recipes/export_shopping_cart/'
+    first, second = client.post(url), client.post(url)
+    assert first.status_code == second.status_code == 202
+    assert first.data['id'] == second.data['id']
+    assert Job.objects.count() == 1
+
+
+def test_cart_entry_response_shows_multiplier(client, recipe, author):
+    client.force_authenticate(author)
+    url = f'/api/recipes/{recipe.id}/shopping_cart/'
+    response = client.post(url)
+    assert response.status_code == 201
+    assert response.data['multiplier'] == 1
+    response = client.patch(url, {'multiplier': 3}, format='json')
+    assert response.status_code == 200
+    assert response.data['id'] == recipe.id
+    assert response.data['multiplier'] == 3
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from jobs.models import Job
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeNeighbor,
+    Tag,
+)
+from recipes.signals import refresh_recipes
+from recipes.similarity import load_vectors
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(author, tag, ingredient):
+    """Рецепты с общими мукой и тегом и один рецепт без общих признаков."""
+    eggs = Ingredient.objects.create(name='яйца', measurement_unit='шт')
+    salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+    dinner = Tag.objects.create(name='Ужин', color='#49B64E', slug='dinner')
+    recipes = []
+    for index, (ingredients, tags) in enumerate((
+            ((ingredient, eggs), (tag,)),
+            ((ingredient,), (tag,)),
+            ((eggs, salt), (tag,)),
+            ((ingredient, salt), ()),
+            ((salt,), (dinner,)))):
+        recipe = Recipe.objects.create(
+            author=author, name=f'Рецепт {index}', text='Текст.',
+            cooking_time=10, image=f'images/{index}.jpg')
+        recipe.tags.set(tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=item, amount=1)
+            for item in ingredients)
+        recipes.append(recipe)
+    return recipes
+
+
+def neighbors(vectors, recipe_id):
+    return vectors.top_neighbors(vectors.index([recipe_id]))
+
+
+def test_partial_vectors_give_full_scores(recipes):
+    changed, tags_only, unrelated = recipes[1], recipes[2], recipes[4]
+    partial = load_vectors([changed.id])
+    # Кандидаты — только рецепты с общими ингредиентами.
+    assert tags_only.id not in partial.recipe_ids
+    assert unrelated.id not in partial.recipe_ids
+    expected = [row for row in neighbors(load_vectors(), changed.id)
+                if row[1] != tags_only.id]
+    actual = neighbors(partial, changed.id)
+    assert [row[:2] for row in actual] == [row[:2] for row in expected]
+    assert np.allclose([row[2] for row in actual],
+                       [row[2] for row in expected])
+
+
+def test_similar_is_ordered_by_score_without_join(
+        client, recipes, django_assert_max_num_queries):
+    recipe, *others = recipes
+    RecipeNeighbor.objects.bulk_create(
+        RecipeNeighbor(recipe=recipe, neighbor=other, score=score)
+        for other, score in zip(others, (0.9, 0.7, 0.5, 0.3)))
+    with django_assert_max_num_queries(10) as queries:
+        response = client.get(f'/api/recipes/{recipe.id}/similar/')
+    assert [item['id'] for item in response.data] == [
+        other.id for other in others]
+    neighbors_sql = next(
+        query['sql'] for query in queries.captured_queries
+        if 'recipes_recipeneighbor' in query['sql'])
+    assert 'JOIN' not in neighbors_sql
+
+
+def test_refresh_enqueues_one_job(
+        recipes, django_capture_on_commit_callbacks):
+    # Так обновляются рецепты, например, при переименовании ингредиента.
+    recipe_ids = [recipe.id for recipe in reversed(recipes)]
+    with django_capture_on_commit_callbacks(execute=True):
+        refresh_recipes(recipe_ids)
+    jobs = Job.objects.filter(name='recipes.update_similar')
+    assert list(jobs.values_list('payload', flat=True)) == [
+        {'recipe_ids': sorted(recipe_ids)}]